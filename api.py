@@ -0,0 +1,185 @@
+"""Layanan REST tanpa UI untuk deteksi penyakit ikan.
+
+Memakai model, class_labels dan preprocessing yang sama dengan app.py. Permintaan yang datang
+bersamaan digabung menjadi micro-batch sebelum diteruskan ke model.predict.
+
+    python api.py --port 8000 --max-batch-size 16 --max-wait-ms 10
+    curl --data-binary @gill.jpg -H "Content-Type: image/jpeg" localhost:8000/predict
+"""
+import argparse
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+import metrics
+from inference import idx_to_class, top_k_from
+from ingest import MAX_UPLOAD_BYTES, IngestError, decode_tensor
+from model_registry import get_model, is_ready
+
+MODEL_PATH = "model999.h5"
+MAX_BODY_BYTES = MAX_UPLOAD_BYTES
+
+
+# ======================
+# Micro-batching
+# ======================
+class MicroBatcher:
+    """Kumpulkan permintaan hingga `max_batch_size` atau `max_wait` detik, lalu prediksi sekaligus."""
+
+    def __init__(self, model, max_batch_size=16, max_wait=0.01):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, x):
+        future = Future()
+        self._queue.put((x, future))
+        return future
+
+    def _collect(self):
+        items = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(items) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                items.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return items
+
+    def _run(self):
+        while True:
+            items = self._collect()
+            try:
+                batch = np.stack([x for x, _ in items])
+                with metrics.timer("model_predict_seconds", batch="api"):
+                    probs = self.model.predict(batch, batch_size=len(items), verbose=0)
+            except Exception as e:
+                for _, future in items:
+                    future.set_exception(e)
+                continue
+            # Rata-rata ukuran micro-batch = api_batch_items_total / api_batches_total
+            metrics.inc("api_batches_total")
+            metrics.inc("api_batch_items_total", len(items))
+            for (_, future), p in zip(items, probs):
+                future.set_result((p, len(items)))
+
+
+# ======================
+# HTTP Handler
+# ======================
+class Handler(BaseHTTPRequestHandler):
+    batcher = None  # diisi setelah model siap
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        elif self.path == "/ready":
+            if Handler.batcher is not None and is_ready(MODEL_PATH):
+                self._send_json(200, {"status": "ready"})
+            else:
+                self._send_json(503, {"status": "loading"})
+        elif self.path == "/metrics":
+            body = metrics.render_prometheus().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path != "/predict":
+            self._send_json(404, {"error": "not found"})
+            return
+        if Handler.batcher is None:
+            self._send_json(503, {"error": "model belum siap"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            self._send_json(400, {"error": "Content-Length tidak valid"})
+            return
+        if not 0 < length <= MAX_BODY_BYTES:
+            self._send_json(413 if length > MAX_BODY_BYTES else 400, {"error": "ukuran body tidak valid"})
+            return
+
+        start = time.perf_counter()
+        try:
+            # Decode & preprocess yang sama persis dengan app.py (draft, batas byte & piksel)
+            with metrics.timer("upload_decode_seconds"):
+                x = decode_tensor(self.rfile.read(length))
+        except IngestError as e:
+            self._send_json(400, {"error": f"gambar tidak dapat dibaca: {e}"})
+            return
+
+        try:
+            probs, batch_size = Handler.batcher.submit(x).result()
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+            return
+
+        metrics.observe("api_request_seconds", time.perf_counter() - start)
+        top = top_k_from(probs, k=3)
+        self._send_json(200, {
+            "label": top[0][0],
+            "confidence": top[0][1],
+            "probabilities": {idx_to_class[i]: float(p) for i, p in enumerate(probs)},
+            "top_k": [{"label": label, "probability": p} for label, p in top],
+            "batch_size": batch_size,
+            "latency_ms": (time.perf_counter() - start) * 1000,
+        })
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _warm_up(max_batch_size, max_wait, num_threads):
+    model = get_model(MODEL_PATH, num_threads=num_threads)
+    Handler.batcher = MicroBatcher(model, max_batch_size=max_batch_size, max_wait=max_wait)
+
+
+def main():
+    global MODEL_PATH
+    parser = argparse.ArgumentParser(description="Layanan REST deteksi penyakit ikan")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--max-batch-size", type=int, default=16)
+    parser.add_argument("--max-wait-ms", type=float, default=10.0)
+    parser.add_argument("--threads", type=int, help="Jumlah thread inferensi (backend .tflite / Keras)")
+    args = parser.parse_args()
+    MODEL_PATH = args.model
+
+    # Model dimuat di background; /ready baru lolos setelah model selesai di-warm-up
+    threading.Thread(
+        target=_warm_up, args=(args.max_batch_size, args.max_wait_ms / 1000, args.threads), daemon=True
+    ).start()
+
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    print(f"Melayani di http://{args.host}:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,21 @@
 import streamlit as st
 import os
-import numpy as np
-from tensorflow.keras.models import load_model
-from tensorflow.keras.preprocessing import image
-from PIL import Image
-from datetime import datetime
-import plotly.express as px
+import time
+import logging
+from datetime import datetime, timedelta
+import metrics
+from model_registry import get_model, model_info, is_ready, preload
+from assets import asset_bytes, prepare_in_background
+
+# Modul berat (TensorFlow, Plotly, pandas, PIL, numpy) diimpor di dalam halaman yang membutuhkannya,
+# sehingga Beranda, Edukasi dan Tentang bisa tampil tanpa menunggu semuanya dimuat.
+
+# Waktu mulai script run ini, untuk metrik page_render_seconds di akhir file
+_run_start = time.perf_counter()
+metrics.inc("app_reruns_total")
+METRICS_FILE = os.environ.get("IKANCHECK_METRICS_FILE", "metrics.prom")
+ADMIN_MODE = os.environ.get("IKANCHECK_ADMIN") == "1"
+logger = logging.getLogger(__name__)
 
 # ======================
 # Konfigurasi Halaman Utama
@@ -48,22 +58,67 @@ st.markdown("""
 # ======================
 # Pemuatan Model & Konfigurasi Awal
 # ======================
-MODEL_PATH = "model999.h5"
-model = load_model(MODEL_PATH)
-
-class_labels = {
-    "Bacterial Red disease": 0,
-    "Bacterial diseases - Aeromoniasis": 1,
-    "Bacterial gill disease": 2,
-    "Fungal diseases Saprolegniasis": 3,
-    "Healthy Fish": 4,
-    "Parasitic diseases": 5,
-    "Viral diseases White tail disease": 6
-}
-idx_to_class = {v: k for k, v in class_labels.items()}
-
-HISTORY_DIR = "riwayat_upload"
-os.makedirs(HISTORY_DIR, exist_ok=True)
+# Backend dipilih dari ekstensi file: .h5 (Keras) atau .tflite hasil `python backends.py export`
+MODEL_PATH = os.environ.get("IKANCHECK_MODEL", "model999.h5")
+MODEL_THREADS = int(os.environ.get("IKANCHECK_THREADS", "0")) or None
+# IKANCHECK_PRELOAD=0 menunda pemuatan model sampai halaman Deteksi dibuka
+PRELOAD_MODEL = os.environ.get("IKANCHECK_PRELOAD", "1") == "1"
+# Kaskade triase opsional (lihat triage.py): model kecil menjawab ikan yang jelas sehat tanpa Xception
+TRIAGE_MODEL_PATH = os.environ.get("IKANCHECK_TRIAGE_MODEL")
+TRIAGE_THRESHOLD = float(os.environ.get("IKANCHECK_TRIAGE_THRESHOLD", "0.9"))
+CACHE_DIR = "cache_prediksi"
+
+@st.cache_resource
+def start_preload():
+    # Sekali per proses: model di-warm-up di background sementara halaman pertama sudah tampil
+    if not PRELOAD_MODEL:
+        return None
+    if TRIAGE_MODEL_PATH:
+        preload(TRIAGE_MODEL_PATH, num_threads=MODEL_THREADS)
+    return preload(MODEL_PATH, num_threads=MODEL_THREADS)
+
+start_preload()
+
+@st.cache_resource
+def get_cascade(threshold):
+    from triage import TriageCascade
+    return TriageCascade(get_model(TRIAGE_MODEL_PATH, num_threads=MODEL_THREADS),
+                         get_model(MODEL_PATH, num_threads=MODEL_THREADS),
+                         healthy_threshold=threshold)
+
+def _page_model():
+    if TRIAGE_MODEL_PATH:
+        return get_cascade(TRIAGE_THRESHOLD)
+    return get_model(MODEL_PATH, num_threads=MODEL_THREADS)
+
+def load_model_for_page():
+    # Model dimuat sekali per proses dan dipakai bersama oleh semua sesi & rerun
+    if not is_ready(MODEL_PATH) or (TRIAGE_MODEL_PATH and not is_ready(TRIAGE_MODEL_PATH)):
+        with st.spinner("Memuat model..."):
+            return _page_model()
+    return _page_model()
+
+@st.cache_resource
+def get_prediction_cache(model_id):
+    from prediction_cache import PredictionCache
+    return PredictionCache(model_id, disk_dir=CACHE_DIR)
+
+def current_prediction_cache():
+    from prediction_cache import model_identity
+    model_id = model_identity(MODEL_PATH)
+    if TRIAGE_MODEL_PATH:
+        # Hasil kaskade bergantung pada model triase dan ambangnya juga
+        model_id += f"|{model_identity(TRIAGE_MODEL_PATH)}|{TRIAGE_THRESHOLD}"
+    return get_prediction_cache(model_id)
+
+@st.cache_resource
+def get_job_queue():
+    from jobs import JobQueue
+    return JobQueue()
+
+@st.cache_resource
+def startup_marks():
+    return {}
 
 # ======================
 # Database Teks (Saran & Edukasi)
@@ -233,20 +288,51 @@ edukasi_lengkap = {
 
 
 # ======================
-# Fungsi Prediksi
+# Aset Statis
 # ======================
-def model_prediction(img):
-    img = img.resize((299, 299))
-    x = image.img_to_array(img)
-    x = np.expand_dims(x, axis=0) / 255.0
-    preds = model.predict(x)
-    return np.argmax(preds), np.max(preds)
+BERANDA_IMG_WIDTH = 800
+EDUKASI_IMG_WIDTH = 600
+STATIC_ASSETS = [("bgikan.jpg", BERANDA_IMG_WIDTH)] + [
+    (konten["img"], EDUKASI_IMG_WIDTH) for konten in edukasi_lengkap.values()
+]
+
+@st.cache_resource
+def start_asset_preparation():
+    # Sekali per proses: validasi path & buat varian web terkompresi di background
+    return prepare_in_background(STATIC_ASSETS)
+
+_, asset_report = start_asset_preparation()
 
 # ======================
 # Sidebar Navigasi
 # ======================
 st.sidebar.title("🧭 Navigasi")
-page = st.sidebar.selectbox("Pilih Halaman", ["🏠 Beranda", "🔍 Deteksi Penyakit", "📚 Edukasi Penyakit", "📝 Riwayat", "ℹ️ Tentang"])
+page = st.sidebar.selectbox("Pilih Halaman", ["🏠 Beranda", "🔍 Deteksi Penyakit", "📚 Edukasi Penyakit", "📝 Riwayat", "📊 Analitik", "ℹ️ Tentang"])
+
+info_model = model_info(MODEL_PATH)
+if info_model:
+    st.sidebar.caption(
+        f"Model `{os.path.basename(MODEL_PATH)}` dimuat dalam {info_model['load_seconds']:.1f} dtk "
+        f"(warm-up {info_model['warmup_seconds']:.2f} dtk, siap {info_model['ready_after_start_seconds']:.1f} dtk "
+        f"setelah proses mulai) · "
+        f"bobot {info_model['param_bytes'] / 2**20:.0f} MB · "
+        f"RSS +{info_model['rss_delta_bytes'] / 2**20:.0f} MB"
+    )
+    prediction_cache = current_prediction_cache()
+    cache_stats = prediction_cache.stats
+    st.sidebar.caption(
+        f"Cache prediksi: {cache_stats['hits']} hit memori · {cache_stats['disk_hits']} hit disk · "
+        f"{cache_stats['misses']} miss · {len(prediction_cache)} entri"
+    )
+    if TRIAGE_MODEL_PATH and is_ready(TRIAGE_MODEL_PATH):
+        cascade = get_cascade(TRIAGE_THRESHOLD)
+        if cascade.escalation_rate is not None:
+            st.sidebar.caption(
+                f"Triase (ambang {TRIAGE_THRESHOLD:.2f}): {cascade.stats['escalated']} dari "
+                f"{cascade.stats['total']} gambar diteruskan ke Xception ({cascade.escalation_rate:.0%})"
+            )
+elif PRELOAD_MODEL:
+    st.sidebar.caption("Model sedang dimuat di latar belakang...")
 
 
 # ======================
@@ -261,10 +347,10 @@ if page == "🏠 Beranda":
     st.markdown('<div class="card">', unsafe_allow_html=True)
     col1, col2 = st.columns([1, 2])
     with col1:
-        try:
-            img = Image.open("bgikan.jpg")
+        img = asset_bytes("bgikan.jpg", BERANDA_IMG_WIDTH)
+        if img is not None:
             st.image(img, caption="IkanCheck", use_container_width=True)
-        except FileNotFoundError:
+        else:
             st.error("Gambar bgikan.jpg tidak ditemukan!")
     with col2:
         st.markdown("""
@@ -307,14 +393,44 @@ if page == "🏠 Beranda":
 # ----- HALAMAN DETEKSI (REVISI UKURAN GAMBAR) -----
 # ======================
 elif page == "🔍 Deteksi Penyakit":
+    import plotly.express as px
+    from inference import (class_labels, idx_to_class, predict_many, iter_image_sources,
+                           count_image_sources, TTA_MAX_VIEWS)
+    from ingest import ingest, IngestError
+    from history import save_detection
+
     st.title("🔍 Deteksi Penyakit Ikan")
     st.info("Unggah gambar ikan Anda untuk memulai deteksi. Untuk hasil terbaik, ikuti tips di samping.")
 
+    model = load_model_for_page()
+    prediction_cache = current_prediction_cache()
+    detection_jobs = get_job_queue()
+
+    mode = st.radio("Mode Deteksi", ["Satu Gambar", "Banyak Gambar (Batch)", "Video / Kamera"], horizontal=True)
     col1, col2 = st.columns([2, 1])
 
     with col1:
-        uploaded_file = st.file_uploader("Pilih atau seret gambar ikan ke sini", 
-                                         type=["jpg", "jpeg", "png"])
+        if mode == "Satu Gambar":
+            uploaded_file = st.file_uploader("Pilih atau seret gambar ikan ke sini", 
+                                             type=["jpg", "jpeg", "png"])
+        elif mode == "Banyak Gambar (Batch)":
+            uploaded_file = None
+            batch_files = st.file_uploader("Pilih beberapa gambar atau satu arsip .zip",
+                                           type=["jpg", "jpeg", "png", "zip"],
+                                           accept_multiple_files=True)
+        else:
+            uploaded_file = None
+            sumber_video = st.radio("Sumber", ["File video", "Kamera lokal"], horizontal=True)
+            if sumber_video == "File video":
+                video_file = st.file_uploader("Pilih file video", type=["mp4", "avi", "mov", "mkv"])
+            else:
+                video_file = None
+                kamera_index = st.number_input("Indeks kamera", min_value=0, value=0, step=1)
+            v_col1, v_col2, v_col3 = st.columns(3)
+            sample_fps = v_col1.number_input("Frame dianalisis per detik", 0.1, 10.0, 1.0, 0.1)
+            hash_threshold = v_col2.slider("Toleransi frame mirip", 0, 20, 6,
+                                           help="Jarak Hamming dHash; frame dengan jarak ≤ nilai ini dilewati")
+            durasi_maks = v_col3.number_input("Durasi maksimum (detik)", 5, 3600, 60, 5)
 
     with col2:
         st.subheader("💡 Tips Foto Akurat")
@@ -325,45 +441,174 @@ elif page == "🔍 Deteksi Penyakit":
         - **Satu Ikan per Foto:** Fokus pada satu ikan untuk hasil terbaik.
         """)
 
-    if uploaded_file is not None:
-        img = Image.open(uploaded_file)
+    if mode == "Banyak Gambar (Batch)":
+        if batch_files and st.button("Deteksi Semua"):
+            import pandas as pd
+            rows = []
+            # Isi arsip .zip dihitung per gambar, bukan sebagai satu file
+            total = count_image_sources(batch_files)
+            progress = st.progress(0.0, text="Menganalisis gambar...")
+            for name, probs, error in predict_many(model, iter_image_sources(batch_files), cache=prediction_cache):
+                if probs is None:
+                    rows.append({'File': name, 'Hasil': f"Gagal dibaca: {error}", 'Keyakinan': None})
+                else:
+                    rows.append({'File': name, 'Hasil': idx_to_class[int(probs.argmax())],
+                                 'Keyakinan': float(probs.max())})
+                progress.progress(min(len(rows) / max(total, 1), 1.0),
+                                  text=f"{len(rows)} dari {total} gambar dianalisis")
+            progress.empty()
+
+            df = pd.DataFrame(rows)
+            st.success(f"{len(df)} gambar selesai dianalisis.")
+            st.dataframe(
+                df,
+                column_config={'Keyakinan': st.column_config.ProgressColumn(
+                    'Keyakinan', format='%.2f', min_value=0.0, max_value=1.0)},
+                use_container_width=True, hide_index=True
+            )
+            st.bar_chart(df['Hasil'].value_counts())
+
+    elif mode == "Video / Kamera":
+        siap = video_file is not None or sumber_video == "Kamera lokal"
+        if siap and st.button("Analisis Video"):
+            import tempfile
+            import pandas as pd
+            from video import analyze_video
+
+            status = st.empty()
+            def tampilkan_progres(t, stats):
+                status.caption(f"Detik {t:.1f} · {stats['analyzed']} frame dianalisis · "
+                               f"{stats['duplicates']} frame mirip dilewati")
+
+            # OpenCV butuh path file, jadi unggahan ditulis ke file sementara; path dibuat sebelum
+            # `try` agar `finally` selalu bisa menghapusnya
+            tmp_path = None
+            if video_file is not None:
+                fd, tmp_path = tempfile.mkstemp(suffix=os.path.splitext(video_file.name)[1])
+                os.close(fd)
+            try:
+                if tmp_path is not None:
+                    with open(tmp_path, "wb") as f:
+                        f.write(video_file.getbuffer())
+                    source = tmp_path
+                else:
+                    source = int(kamera_index)
+                with st.spinner('Menganalisis video...'):
+                    timeline, stats = analyze_video(model, source, sample_fps=sample_fps,
+                                                    hash_threshold=hash_threshold,
+                                                    max_seconds=durasi_maks,
+                                                    on_progress=tampilkan_progres)
+            except RuntimeError as e:
+                st.error(str(e))
+                timeline, stats = [], None
+            finally:
+                if tmp_path is not None:
+                    os.remove(tmp_path)
+            status.empty()
+
+            if stats is not None and not timeline:
+                st.warning("Tidak ada frame yang bisa dibaca dari sumber video.")
+            elif timeline:
+                st.success(
+                    f"{stats['sampled']} frame disampling, {stats['duplicates']} dilewati karena mirip, "
+                    f"{stats['analyzed']} dianalisis dalam {stats['batches']} batch "
+                    f"({stats['seconds']:.1f} dtk)."
+                )
+                df = pd.DataFrame(
+                    [p for _, p in timeline], columns=list(class_labels.keys())
+                )
+                df.insert(0, 'Detik', [t for t, _ in timeline])
+                df = df.melt(id_vars='Detik', var_name='Kelas', value_name='Probabilitas')
+                fig = px.line(
+                    df, x='Detik', y='Probabilitas', color='Kelas',
+                    title="Timeline Keyakinan per Kelas",
+                    labels={'Probabilitas': 'Tingkat Keyakinan', 'Kelas': 'Jenis Penyakit'}
+                )
+                fig.update_layout(yaxis_range=[0, 1])
+                st.plotly_chart(fig, use_container_width=True)
+
+                dominan = df.loc[df.groupby('Detik')['Probabilitas'].idxmax(), 'Kelas'].value_counts()
+                st.info(f"Kelas paling sering terdeteksi: **{dominan.index[0]}** "
+                        f"({dominan.iloc[0] / dominan.sum():.0%} dari frame)")
+
+    elif uploaded_file is not None:
+        # Batas ukuran, decode draft, orientasi EXIF & RGB; `img` berukuran maksimal 1024 px.
+        # Hasilnya disimpan per sesi agar rerun polling tidak men-decode unggahan yang sama berulang kali.
+        # file_id unik per unggahan; nama file saja tidak cukup (foto ponsel sering bernama image.jpg)
+        ingest_key = uploaded_file.file_id
+        ingest_cache = st.session_state.get("deteksi_ingest")
+        if ingest_cache is not None and ingest_cache[0] == ingest_key:
+            ingested = ingest_cache[1]
+        else:
+            try:
+                ingested = ingest(uploaded_file)
+            except IngestError as e:
+                st.error(f"Gambar tidak dapat diproses: {e}")
+                st.stop()
+            st.session_state["deteksi_ingest"] = (ingest_key, ingested)
+        img = ingested.display
         with col1:
             # --- [PERUBAHAN DI SINI] ---
             # Ganti 'use_container_width=True' dengan 'width=500'
             st.image(img, caption="Gambar yang akan dideteksi", width=500) 
             
+            with st.expander("🎯 Mode Akurasi (TTA & tiling)"):
+                tta_aktif = st.checkbox("Analisis beberapa view (flip & potongan) dalam satu batch",
+                                        help="Membantu menemukan lesi kecil, dengan biaya CPU beberapa kali lipat.")
+                t_col1, t_col2, t_col3 = st.columns(3)
+                tta_views = t_col1.slider("Jumlah view", 2, TTA_MAX_VIEWS, 6)
+                tta_budget = t_col2.number_input("Batas waktu model (ms)", 100, 10000, 2000, 100)
+                tta_agregasi = t_col3.selectbox("Agregasi", ["mean", "max"])
+            tta = ({"n_views": tta_views, "latency_budget": tta_budget / 1000, "aggregate": tta_agregasi}
+                   if tta_aktif else None)
+
+            upload_key = f"{ingest_key}:{tta}"
             if st.button("Deteksi Sekarang"):
-                # (Sisa kode di bawah ini tetap sama seperti sebelumnya)
+                # Inferensi berjalan di worker pool; penyimpanan riwayat (gambar asli, thumbnail &
+                # metadata) dijadwalkan fire-and-forget setelah hasil keluar
+                job_id = detection_jobs.submit_detection(model, img, x=ingested.tensor,
+                                                         timings=ingested.timings,
+                                                         cache=prediction_cache,
+                                                         on_result=save_detection, tta=tta)
+                st.session_state["deteksi_job"] = (upload_key, job_id)
+
+            job_key, job_id = st.session_state.get("deteksi_job", (None, None))
+            job = detection_jobs.get(job_id) if job_key == upload_key else None
+
+            if job is not None and not job.done:
+                # Polling: cek lagi sebentar kemudian tanpa menahan thread script selama inferensi
                 with st.spinner('Menganalisis gambar...'):
-                    pred_class, confidence = model_prediction(img)
-                    label = idx_to_class[pred_class]
-                    
-                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    save_path = os.path.join(HISTORY_DIR, f"{timestamp}_{label}.jpg")
-                    img.save(save_path)
-                    
-                    import pandas as pd
-                    preds = model.predict(np.expand_dims(np.array(img.resize((299,299)))/255.0, axis=0))[0]
-                    df = pd.DataFrame({
-                        'Kelas': list(class_labels.keys()),
-                        'Probabilitas': preds
-                    }).sort_values(by='Probabilitas', ascending=False)
-                    
-                    fig = px.bar(
-                        df, x='Probabilitas', y='Kelas', orientation='h',
-                        title="Grafik Keyakinan per Kelas",
-                        labels={'Probabilitas': 'Tingkat Keyakinan', 'Kelas': 'Jenis Penyakyt'},
-                        text_auto='.2%'
-                    )
-                    fig.update_layout(xaxis_range=[0,1])
-                    
-                    with col2:
-                        col2.empty() 
-                        st.plotly_chart(fig, use_container_width=True)
+                    time.sleep(0.25)
+                st.rerun()
+            elif job is not None and job.error:
+                st.error(f"Deteksi gagal: {job.error}")
+            elif job is not None:
+                result = job.result
+                label, confidence = result.label, result.confidence
+
+                from charts import probability_figure
+                with metrics.timer("plotly_figure_seconds"):
+                    fig = probability_figure(result.probabilities)
+                
+                with col2:
+                    col2.empty() 
+                    st.plotly_chart(fig, use_container_width=True)
 
                 st.divider()
                 st.success(f"Hasil Deteksi: **{label}**")
                 st.info(f"Tingkat Keyakinan: {confidence*100:.2f}%")
+                if result.cached:
+                    st.caption("Hasil diambil dari cache prediksi (gambar ini pernah dianalisis).")
+                st.caption(
+                    f"Waktu inferensi: {result.timings['total']*1000:.0f} ms "
+                    f"(decode {result.timings.get('decode', 0)*1000:.0f} ms, "
+                    f"preprocess {result.timings.get('preprocess', 0)*1000:.0f} ms, "
+                    f"model {result.timings['predict']*1000:.0f} ms)"
+                )
+                if "views" in result.timings:
+                    st.caption(f"Mode akurasi: {result.timings['views']} view, "
+                               f"{result.timings['cost_ratio']:.1f}× biaya satu view "
+                               f"({result.timings['baseline_predict']*1000:.0f} ms).")
                 
                 saran = saran_pengobatan.get(label, "Tidak ada saran spesifik.")
                 with st.expander("🔬 **Lihat Detail dan Saran Penanganan**"):
@@ -401,9 +646,10 @@ elif page == "📚 Edukasi Penyakit":
             col1, col2 = st.columns([1, 2])
             
             with col1:
-                try:
-                    st.image(konten["img"], use_container_width=True)
-                except FileNotFoundError:
+                img = asset_bytes(konten["img"], EDUKASI_IMG_WIDTH)
+                if img is not None:
+                    st.image(img, use_container_width=True)
+                else:
                     st.warning(f"Gambar {konten['img']} tidak ditemukan.")
 
             with col2:
@@ -427,59 +673,138 @@ elif page == "📚 Edukasi Penyakit":
 # ----- HALAMAN RIWAYAT -----
 # ======================
 elif page == "📝 Riwayat":
+    from inference import class_labels
+    from history import TIME_FORMAT, ensure_thumbnail, count_detections, query_detections, delete_detection
+
     st.title("📝 Riwayat Deteksi")
     st.markdown("Berikut adalah riwayat gambar yang pernah Anda deteksi. Arahkan kursor ke gambar untuk melihat opsi hapus.")
 
-    try:
-        files = sorted(
-            [f for f in os.listdir(HISTORY_DIR) if f.endswith(('.jpg', '.png', '.jpeg'))],
-            reverse=True
-        )
-    except FileNotFoundError:
-        files = []
+    # Filter dijalankan sebagai query terindeks di database riwayat, bukan dengan membaca folder
+    f_col1, f_col2, f_col3 = st.columns([2, 2, 1])
+    with f_col1:
+        filter_kelas = st.multiselect("Jenis penyakit", list(class_labels.keys()))
+    with f_col2:
+        rentang = st.date_input("Rentang tanggal", value=(), format="DD/MM/YYYY")
+    with f_col3:
+        min_keyakinan = st.slider("Keyakinan minimum", 0.0, 1.0, 0.0, 0.05)
+
+    filters = {"labels": filter_kelas, "min_confidence": min_keyakinan}
+    if len(rentang) == 2:
+        filters["start"] = datetime.combine(rentang[0], datetime.min.time())
+        filters["end"] = datetime.combine(rentang[1] + timedelta(days=1), datetime.min.time())
+
+    total = count_detections(**filters)
 
-    if not files:
+    if not total:
         st.info("Belum ada riwayat deteksi.")
     else:
         JUMLAH_KOLOM = 4
+        PER_HALAMAN = 12
+        jumlah_halaman = (total - 1) // PER_HALAMAN + 1
+        halaman = st.number_input(f"Halaman (dari {jumlah_halaman})", min_value=1,
+                                  max_value=jumlah_halaman, value=1, step=1)
+        st.caption(f"Total {total} gambar riwayat.")
+        # Hanya baris & thumbnail untuk halaman aktif yang dibaca dan dikirim ke browser
+        records = query_detections(limit=PER_HALAMAN, offset=(halaman - 1) * PER_HALAMAN, **filters)
         cols = st.columns(JUMLAH_KOLOM)
 
-        for i, file_name in enumerate(files):
+        for i, rec in enumerate(records):
             with cols[i % JUMLAH_KOLOM]:
-                
-                # --- [BAGIAN YANG DIPERBAIKI] ---
-                # Logika parsing nama file yang lebih baik
-                try:
-                    parts = file_name.split('_')
-                    timestamp_str = f"{parts[0]}_{parts[1]}"
-                    # Gabungkan sisa bagian nama file, lalu hapus ekstensi .jpg/.png
-                    label_part = "_".join(parts[2:])
-                    label = os.path.splitext(label_part)[0]
-                    
-                    dt_object = datetime.strptime(timestamp_str, "%Y%m%d_%H%M%S")
-                    formatted_time = dt_object.strftime("%d %B %Y, %H:%M")
-                
-                except (ValueError, IndexError):
-                    # Jika format nama file tidak sesuai, tampilkan nama file tanpa ekstensi
-                    label = os.path.splitext(file_name)[0]
-                    formatted_time = "Tidak diketahui"
+                formatted_time = datetime.strptime(rec["created_at"], TIME_FORMAT).strftime("%d %B %Y, %H:%M")
 
                 # Gunakan CSS card
                 st.markdown(f'<div class="card">', unsafe_allow_html=True)
                 
-                image_path = os.path.join(HISTORY_DIR, file_name)
-                st.image(image_path, use_container_width=True)
+                image_path = rec["image_path"]
+                try:
+                    st.image(ensure_thumbnail(image_path), use_container_width=True)
+                except OSError:
+                    st.warning("Gambar tidak dapat dibaca.")
                 
-                # Tampilkan informasi yang sudah diparsing dengan benar
-                st.markdown(f"**Hasil:** `{label}`")
+                st.markdown(f"**Hasil:** `{rec['label']}`")
+                if rec["confidence"] is not None:
+                    st.caption(f"Keyakinan: {rec['confidence']*100:.2f}%")
                 st.caption(f"Waktu: {formatted_time}")
                 
-                if st.button("Hapus", key=file_name):
-                    os.remove(image_path)
+                # Gambar asli resolusi penuh hanya dimuat bila diminta
+                if st.checkbox("Lihat asli", key=f"asli_{rec['id']}"):
+                    st.image(image_path, use_container_width=True)
+
+                if st.button("Hapus", key=f"hapus_{rec['id']}"):
+                    delete_detection(rec["id"])
                     st.rerun() 
 
                 st.markdown(f'</div>', unsafe_allow_html=True)
 
+# ======================
+# ----- HALAMAN ANALITIK -----
+# ======================
+elif page == "📊 Analitik":
+    import pandas as pd
+    import plotly.express as px
+    from inference import class_labels
+    from history import LOW_CONFIDENCE, daily_stats, confidence_histogram
+
+    st.title("📊 Analitik Penyakit")
+    st.markdown("Ringkasan seluruh riwayat deteksi untuk memantau munculnya wabah di kolam.")
+
+    periode = st.selectbox("Periode", ["30 hari terakhir", "90 hari terakhir", "1 tahun terakhir", "Semua"])
+    hari = {"30 hari terakhir": 30, "90 hari terakhir": 90, "1 tahun terakhir": 365}.get(periode)
+    start = datetime.now() - timedelta(days=hari - 1) if hari else None
+
+    # Dibaca dari tabel agregat yang diperbarui setiap deteksi disimpan, bukan dari folder gambar
+    df = pd.DataFrame(daily_stats(start=start), columns=['day', 'label', 'n', 'n_low', 'n_conf', 'conf_sum'])
+
+    if df.empty:
+        st.info("Belum ada riwayat deteksi pada periode ini.")
+    else:
+        total = int(df['n'].sum())
+        total_conf = int(df['n_conf'].sum())
+        total_low = int(df['n_low'].sum())
+        sakit = int(df.loc[df['label'] != "Healthy Fish", 'n'].sum())
+
+        m1, m2, m3, m4 = st.columns(4)
+        m1.metric("Total Deteksi", total)
+        m2.metric("Terindikasi Sakit", f"{sakit / total:.0%}")
+        m3.metric("Rata-rata Keyakinan", f"{df['conf_sum'].sum() / total_conf:.1%}" if total_conf else "-")
+        m4.metric(f"Keyakinan < {LOW_CONFIDENCE:.0%}", f"{total_low / total_conf:.1%}" if total_conf else "-")
+        if TRIAGE_MODEL_PATH:
+            st.caption("Statistik keyakinan hanya dari hasil Xception; deteksi yang berhenti di model triase "
+                       "tetap dihitung di jumlah deteksi.")
+
+        df['Tanggal'] = pd.to_datetime(df['day'])
+        fig = px.bar(
+            df, x='Tanggal', y='n', color='label',
+            title="Jumlah Deteksi per Kelas",
+            labels={'n': 'Jumlah Deteksi', 'label': 'Jenis Penyakit'},
+            category_orders={'label': list(class_labels.keys())}
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
+        a_col1, a_col2 = st.columns(2)
+        with a_col1:
+            harian = df.groupby('Tanggal')[['n_low', 'n_conf']].sum().reset_index()
+            harian = harian[harian['n_conf'] > 0]
+            harian['Rasio'] = harian['n_low'] / harian['n_conf']
+            fig = px.line(
+                harian, x='Tanggal', y='Rasio', markers=True,
+                title=f"Rasio Hasil Keyakinan Rendah (< {LOW_CONFIDENCE:.0%})",
+                labels={'Rasio': 'Rasio'}
+            )
+            fig.update_layout(yaxis_tickformat='.0%', yaxis_range=[0, 1])
+            st.plotly_chart(fig, use_container_width=True)
+
+        with a_col2:
+            hist = pd.DataFrame(confidence_histogram(), columns=['label', 'bucket', 'n'])
+            fig = px.bar(
+                hist, x='bucket', y='n', color='label',
+                title="Distribusi Tingkat Keyakinan (seluruh riwayat)",
+                labels={'bucket': 'Tingkat Keyakinan', 'n': 'Jumlah', 'label': 'Jenis Penyakit'},
+                category_orders={'label': list(class_labels.keys())}
+            )
+            fig.update_layout(xaxis_tickformat='.0%', xaxis_range=[0, 1])
+            st.plotly_chart(fig, use_container_width=True)
+
 # ======================
 # ----- HALAMAN TENTANG -----
 # ======================
@@ -493,4 +818,49 @@ elif page == "ℹ️ Tentang":
         - **Framework**: Dibuat dengan menggunakan Streamlit.
         
         Semoga aplikasi ini dapat bermanfaat!
-    """)
\ No newline at end of file
+    """)
+
+# ======================
+# Metrik & Panel Admin
+# ======================
+metrics.observe("page_render_seconds", time.perf_counter() - _run_start, page=page)
+
+# Cold start: waktu dari proses dimulai hingga script run pertama selesai dirender
+marks = startup_marks()
+if "first_paint" not in marks:
+    marks["first_paint"] = time.time() - metrics.process_start_time()
+    marks["first_page"] = page
+    metrics.observe("app_first_paint_seconds", marks["first_paint"])
+    logger.info("First paint %.2f dtk setelah proses mulai (%s)", marks["first_paint"], page)
+try:
+    metrics.write_metrics_file(METRICS_FILE)
+except OSError:
+    pass
+
+if ADMIN_MODE:
+    with st.sidebar.expander("🛠️ Metrik (Admin)"):
+        st.caption(f"First paint: **{marks['first_paint']:.2f} dtk** setelah proses mulai ({marks['first_page']})")
+        counters, histograms = metrics.snapshot()
+        for (name, labels), value in sorted(counters.items()):
+            label_str = ", ".join(f"{k}={v}" for k, v in labels)
+            st.caption(f"`{name}`{f' ({label_str})' if label_str else ''}: **{value:g}**")
+        rows = []
+        for (name, labels), hist in sorted(histograms.items()):
+            p95 = metrics.quantile(hist, 0.95)
+            rows.append({
+                'Metrik': name + "".join(f" {k}={v}" for k, v in labels),
+                'n': hist['count'],
+                'Rata-rata (ms)': round(hist['sum'] / hist['count'] * 1000, 1),
+                'p95 ≤ (ms)': p95 * 1000 if p95 != float("inf") else None,
+            })
+        if rows:
+            st.dataframe(rows, hide_index=True, use_container_width=True)
+        if "report" in asset_report:
+            aset = asset_report["report"]
+            hilang = [a["path"] for a in aset if not a["ok"]]
+            asli = sum(a["original_bytes"] for a in aset if a["ok"])
+            varian = sum(a["variant_bytes"] for a in aset if a["ok"])
+            st.caption(f"Aset statis: {asli / 2**10:.0f} KB → {varian / 2**10:.0f} KB"
+                       + (f" · hilang: {', '.join(hilang)}" if hilang else ""))
+        st.download_button("Unduh format Prometheus", metrics.render_prometheus(),
+                           file_name="metrics.prom", mime="text/plain")
@@ -0,0 +1,113 @@
+"""Aset gambar statis (Beranda & Edukasi): path divalidasi sekali, varian web dibuat sekali dan di-cache.
+
+Varian JPEG terkompresi disimpan di ASSET_CACHE_DIR dengan kunci ukuran & mtime file sumber, lalu
+byte-nya disimpan di memori proses sehingga setiap kunjungan halaman tidak membuka file asli lagi.
+"""
+import hashlib
+import io
+import os
+import threading
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+ASSET_CACHE_DIR = os.path.join(APP_DIR, "cache_aset")
+JPEG_QUALITY = 80
+# Dinaikkan bila aturan pembuatan varian berubah, agar varian lama di cache tidak dipakai lagi
+VARIANT_VERSION = 2
+
+_lock = threading.Lock()
+_memo = {}
+
+
+def resolve(path):
+    """Path absolut aset, atau None. `image/x.jpg` yang tidak ada dicari ulang sebagai `x.jpg` di folder aplikasi."""
+    candidates = [path, os.path.join(APP_DIR, path), os.path.join(APP_DIR, os.path.basename(path))]
+    for candidate in candidates:
+        if os.path.isfile(candidate):
+            return os.path.abspath(candidate)
+    return None
+
+
+def _variant_path(source, width):
+    st = os.stat(source)
+    key = hashlib.sha1(f"{source}:{st.st_size}:{st.st_mtime_ns}:{width}:{JPEG_QUALITY}:{VARIANT_VERSION}".encode()).hexdigest()[:16]
+    name = os.path.splitext(os.path.basename(source))[0]
+    return os.path.join(ASSET_CACHE_DIR, f"{name}_{width}w_{key}.jpg")
+
+
+def _build_variant(source, target, width):
+    from PIL import Image, ImageOps
+
+    with Image.open(source) as img:
+        img.draft("RGB", (width, width))
+        img = ImageOps.exif_transpose(img).convert("RGB")
+        resized = img.width > width
+        if resized:
+            img = img.resize((width, round(img.height * width / img.width)), Image.LANCZOS)
+        buf = io.BytesIO()
+        img.save(buf, format="JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    data = buf.getvalue()
+
+    # Sumber yang sudah kecil bisa membesar bila di-encode ulang; bytes aslinya yang disajikan
+    # (st.image mengenali format dari isi, bukan dari ekstensi file cache)
+    source_bytes = os.path.getsize(source)
+    if not resized and len(data) >= source_bytes:
+        with open(source, "rb") as f:
+            data = f.read()
+
+    os.makedirs(ASSET_CACHE_DIR, exist_ok=True)
+    tmp = f"{target}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, target)
+    return data
+
+
+def asset_bytes(path, width):
+    """Byte JPEG varian web untuk `path` dengan lebar maksimum `width`, atau None bila aset tidak ada."""
+    memo_key = (path, width)
+    data = _memo.get(memo_key)
+    if data is not None:
+        return data
+
+    source = resolve(path)
+    if source is None:
+        return None
+    target = _variant_path(source, width)
+    with _lock:
+        if memo_key not in _memo:
+            if os.path.exists(target):
+                with open(target, "rb") as f:
+                    _memo[memo_key] = f.read()
+            else:
+                _memo[memo_key] = _build_variant(source, target, width)
+        return _memo[memo_key]
+
+
+def prepare(assets):
+    """Validasi & buat varian untuk daftar (path, width). Mengembalikan laporan per aset."""
+    report = []
+    for path, width in assets:
+        source = resolve(path)
+        if source is None:
+            report.append({"path": path, "ok": False})
+            continue
+        data = asset_bytes(path, width)
+        report.append({
+            "path": path,
+            "ok": True,
+            "resolved": os.path.relpath(source, APP_DIR),
+            "original_bytes": os.path.getsize(source),
+            "variant_bytes": len(data),
+        })
+    return report
+
+
+def prepare_in_background(assets):
+    result = {}
+
+    def run():
+        result["report"] = prepare(assets)
+
+    thread = threading.Thread(target=run, name="prepare-assets", daemon=True)
+    thread.start()
+    return thread, result
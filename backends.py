@@ -0,0 +1,177 @@
+"""Backend inferensi yang bisa dipilih: model Keras .h5 asli atau hasil ekspor TFLite (opsional terkuantisasi).
+
+Setiap backend punya `predict(x, batch_size=None, verbose=0)` seperti model Keras, sehingga kode
+pemanggil tidak perlu tahu backend mana yang dipakai. Backend dipilih dari ekstensi file model.
+
+    python backends.py export --quantize float16            # -> model999_float16.tflite
+    python backends.py parity model999_float16.tflite *.jpg  # bandingkan dengan model999.h5
+"""
+import argparse
+import glob
+import json
+import os
+import threading
+
+import numpy as np
+
+DEFAULT_H5 = "model999.h5"
+QUANTIZATIONS = ("none", "float16", "dynamic", "int8")
+
+
+# ======================
+# Backend
+# ======================
+class TFLiteBackend:
+    """Interpreter TFLite dengan jumlah thread yang bisa diatur; input float32 (N, 299, 299, 3)."""
+
+    def __init__(self, path, num_threads=None):
+        try:
+            # tflite_runtime jauh lebih ringan dari TensorFlow penuh bila tersedia
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            from tensorflow.lite import Interpreter
+        self.path = path
+        self.num_threads = num_threads
+        self._interpreter = Interpreter(model_path=path, num_threads=num_threads)
+        self._input = self._interpreter.get_input_details()[0]
+        self._output = self._interpreter.get_output_details()[0]
+        self._batch = None
+        # Satu interpreter tidak aman dipakai beberapa thread sekaligus
+        self._lock = threading.Lock()
+
+    def _quantize(self, x):
+        scale, zero_point = self._input["quantization"]
+        if self._input["dtype"] == np.float32 or not scale:
+            return x.astype(self._input["dtype"])
+        return np.round(x / scale + zero_point).astype(self._input["dtype"])
+
+    def _dequantize(self, y):
+        scale, zero_point = self._output["quantization"]
+        if self._output["dtype"] == np.float32 or not scale:
+            return y.astype(np.float32)
+        return (y.astype(np.float32) - zero_point) * scale
+
+    def predict(self, x, batch_size=None, verbose=0):
+        with self._lock:
+            if self._batch != len(x):
+                self._interpreter.resize_tensor_input(self._input["index"], [len(x), *x.shape[1:]])
+                self._interpreter.allocate_tensors()
+                self._batch = len(x)
+            self._interpreter.set_tensor(self._input["index"], self._quantize(x))
+            self._interpreter.invoke()
+            return self._dequantize(self._interpreter.get_tensor(self._output["index"]))
+
+
+def load_backend(path, num_threads=None):
+    """Muat model sesuai ekstensi: .tflite -> TFLiteBackend, selain itu model Keras."""
+    if path.endswith(".tflite"):
+        return TFLiteBackend(path, num_threads=num_threads)
+
+    import tensorflow as tf
+    if num_threads:
+        try:
+            tf.config.threading.set_intra_op_parallelism_threads(num_threads)
+            tf.config.threading.set_inter_op_parallelism_threads(max(1, num_threads // 2))
+        except RuntimeError:
+            # TensorFlow sudah terinisialisasi; pengaturan thread tidak bisa diubah lagi
+            pass
+    return tf.keras.models.load_model(path)
+
+
+def weight_bytes(model):
+    if isinstance(model, TFLiteBackend):
+        return os.path.getsize(model.path)
+    return int(sum(w.nbytes for w in model.get_weights()))
+
+
+# ======================
+# Ekspor & Uji Kesetaraan
+# ======================
+def export_tflite(h5_path, out_path, quantize="none", representative=None):
+    """Ekspor model Keras ke TFLite.
+
+    `quantize`: "float16" (bobot fp16), "dynamic" (bobot int8), atau "int8" (bobot & aktivasi int8,
+    butuh `representative` berupa iterable array input hasil preprocess).
+    """
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(tf.keras.models.load_model(h5_path))
+    if quantize != "none":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if quantize == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantize == "int8":
+        if representative is None:
+            raise ValueError("Kuantisasi int8 membutuhkan gambar representatif")
+        samples = list(representative)
+        converter.representative_dataset = lambda: ([x[np.newaxis, ...]] for x in samples)
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+
+    with open(out_path, "wb") as f:
+        f.write(converter.convert())
+    return out_path
+
+
+def parity_check(reference, candidate, inputs, batch_size=16):
+    """Bandingkan dua backend pada array input yang sama: kesesuaian top-1 dan selisih probabilitas."""
+    inputs = np.asarray(inputs, dtype=np.float32)
+    ref = np.concatenate([reference.predict(inputs[i:i + batch_size], verbose=0)
+                          for i in range(0, len(inputs), batch_size)])
+    cand = np.concatenate([candidate.predict(inputs[i:i + batch_size], verbose=0)
+                           for i in range(0, len(inputs), batch_size)])
+    delta = np.abs(ref - cand)
+    return {
+        "samples": int(len(inputs)),
+        "top1_agreement": float(np.mean(ref.argmax(axis=1) == cand.argmax(axis=1))),
+        "max_prob_delta": float(delta.max()),
+        "mean_prob_delta": float(delta.mean()),
+    }
+
+
+def _load_samples(patterns):
+    from PIL import Image
+    from inference import preprocess
+
+    paths = sorted({p for pattern in patterns for p in glob.glob(pattern)})
+    arrays = []
+    for path in paths:
+        with Image.open(path) as img:
+            arrays.append(preprocess(img))
+    return arrays
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ekspor model ke TFLite dan uji kesetaraannya")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_export = sub.add_parser("export", help="Ekspor model .h5 ke .tflite")
+    p_export.add_argument("--model", default=DEFAULT_H5)
+    p_export.add_argument("--quantize", choices=QUANTIZATIONS, default="none")
+    p_export.add_argument("--samples", nargs="*", default=["*.jpg", "*.png"],
+                          help="Gambar representatif untuk kuantisasi int8")
+    p_export.add_argument("--out")
+
+    p_parity = sub.add_parser("parity", help="Bandingkan model hasil ekspor dengan model .h5")
+    p_parity.add_argument("candidate")
+    p_parity.add_argument("samples", nargs="*", default=["*.jpg", "*.png"])
+    p_parity.add_argument("--model", default=DEFAULT_H5)
+    p_parity.add_argument("--threads", type=int)
+
+    args = parser.parse_args()
+    if args.command == "export":
+        out = args.out or f"{os.path.splitext(args.model)[0]}_{args.quantize}.tflite"
+        representative = _load_samples(args.samples) if args.quantize == "int8" else None
+        export_tflite(args.model, out, quantize=args.quantize, representative=representative)
+        print(f"{out}: {os.path.getsize(out) / 2**20:.1f} MB "
+              f"(asli {os.path.getsize(args.model) / 2**20:.1f} MB)")
+    else:
+        inputs = _load_samples(args.samples)
+        if not inputs:
+            parser.error("Tidak ada gambar sampel yang ditemukan")
+        report = parity_check(load_backend(args.model),
+                              load_backend(args.candidate, num_threads=args.threads), inputs)
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
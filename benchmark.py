@@ -0,0 +1,219 @@
+"""Benchmark jalur deteksi tanpa browser: decode, preprocess, model.predict, simpan riwayat, end-to-end.
+
+Memakai gambar contoh di repo (bacterial.jpg, gill.jpg, ...) dan gambar sintetis berbagai ukuran,
+lalu menulis hasil p50/p95/p99 dan throughput sebagai JSON. Setiap tahap memanggil fungsi yang sama
+dengan aplikasi (ingest, predict_array, save_detection, grafik), dengan riwayat di folder sementara.
+
+    python benchmark.py --batch-sizes 1 8 32 --threads 1 2 4 --out bench.json
+    python benchmark.py --baseline bench_lama.json --tolerance 0.15   # exit 1 bila ada regresi
+    python benchmark.py --skip-model                                   # hanya tahap tanpa TensorFlow
+"""
+import argparse
+import glob
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+from PIL import Image
+
+from history import save_detection
+from inference import Prediction, predict_array, top_k_from
+from ingest import decode_tensor, ingest
+
+DEFAULT_MODEL = "model999.h5"
+SYNTHETIC_SIZES = [(640, 480), (1920, 1080), (4000, 3000)]
+
+
+# ======================
+# Data Uji
+# ======================
+def load_inputs(patterns, synthetic_sizes, seed=0):
+    """Daftar (nama, bytes terenkode) dari gambar contoh dan gambar sintetis JPEG."""
+    inputs = []
+    for path in sorted({p for pattern in patterns for p in glob.glob(pattern)}):
+        with open(path, "rb") as f:
+            inputs.append((os.path.basename(path), f.read()))
+    rng = np.random.default_rng(seed)
+    for w, h in synthetic_sizes:
+        # Gradien + noise supaya ukuran JPEG mendekati foto asli (noise murni terlalu besar)
+        base = np.linspace(0, 255, w, dtype=np.float32)[np.newaxis, :, np.newaxis]
+        pixels = np.clip(base + rng.normal(0, 20, (h, w, 3)), 0, 255).astype(np.uint8)
+        buf = io.BytesIO()
+        Image.fromarray(pixels).save(buf, format="JPEG", quality=90)
+        inputs.append((f"synthetic_{w}x{h}.jpg", buf.getvalue()))
+    return inputs
+
+
+# ======================
+# Statistik
+# ======================
+def summarize(samples_s, items_per_sample=1):
+    arr = np.asarray(samples_s) * 1000
+    return {
+        "n": int(len(arr)),
+        "mean_ms": float(arr.mean()),
+        "p50_ms": float(np.percentile(arr, 50)),
+        "p95_ms": float(np.percentile(arr, 95)),
+        "p99_ms": float(np.percentile(arr, 99)),
+        "throughput_per_s": float(items_per_sample * len(arr) / (arr.sum() / 1000)),
+    }
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    out = fn(*args)
+    return out, time.perf_counter() - start
+
+
+# ======================
+# Tahap
+# ======================
+def bench_cpu_stages(inputs, iterations):
+    decode, prep, save = [], [], []
+    # Hasil palsu agar penyimpanan riwayat bisa diukur tanpa model
+    probs = np.full(7, 1 / 7, dtype=np.float32)
+    result = Prediction(probabilities=probs, top_k=top_k_from(probs))
+    with tempfile.TemporaryDirectory() as tmp:
+        for _ in range(iterations):
+            for name, data in inputs:
+                ingested = ingest(data)
+                decode.append(ingested.timings["decode"])
+                prep.append(ingested.timings["preprocess"])
+                # Gambar, thumbnail, hash & baris SQLite, sama seperti worker penyimpanan riwayat
+                _, t = timed(save_detection, ingested.display, result, tmp)
+                save.append(t)
+    return {"decode": summarize(decode), "preprocess": summarize(prep), "history_save": summarize(save)}
+
+
+def bench_model(model, arrays, batch_sizes, iterations, threads=None):
+    results = []
+    for batch_size in batch_sizes:
+        batch = np.stack([arrays[i % len(arrays)] for i in range(batch_size)])
+        model.predict(batch, batch_size=batch_size, verbose=0)  # warm-up untuk bentuk batch ini
+        samples = [timed(model.predict, batch, batch_size, 0)[1] for _ in range(iterations)]
+        results.append({"threads": threads, "batch_size": batch_size, **summarize(samples, batch_size)})
+    return results
+
+
+def bench_end_to_end(model, inputs, iterations):
+    from charts import probability_figure
+
+    samples = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for _ in range(iterations):
+            for name, data in inputs:
+                start = time.perf_counter()
+                ingested = ingest(data)
+                result = predict_array(model, ingested.tensor)
+                save_detection(ingested.display, result, tmp)
+                probability_figure(result.probabilities)
+                samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def _model_in_subprocess(args, threads):
+    # Jumlah thread TensorFlow hanya bisa diatur sebelum inisialisasi, jadi tiap nilai di proses terpisah
+    cmd = [sys.executable, __file__, "--model", args.model, "--threads", str(threads),
+           "--iterations", str(args.iterations), "--batch-sizes", *map(str, args.batch_sizes),
+           "--samples", *args.samples, "--model-only"]
+    out = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+    return json.loads(out)["model"]
+
+
+# ======================
+# Perbandingan Baseline
+# ======================
+def compare(current, baseline, tolerance):
+    """Daftar regresi p50 yang lebih lambat dari baseline melebihi `tolerance` (rasio)."""
+    regressions = []
+
+    def check(name, cur, base):
+        if cur and base and cur["p50_ms"] > base["p50_ms"] * (1 + tolerance):
+            regressions.append({"stage": name, "baseline_p50_ms": base["p50_ms"], "p50_ms": cur["p50_ms"]})
+
+    for stage, stats in current.get("stages", {}).items():
+        check(stage, stats, baseline.get("stages", {}).get(stage))
+    check("end_to_end", current.get("end_to_end"), baseline.get("end_to_end"))
+    base_model = {(r["threads"], r["batch_size"]): r for r in baseline.get("model", [])}
+    for r in current.get("model", []):
+        check(f"model[threads={r['threads']},batch={r['batch_size']}]", r, base_model.get((r["threads"], r["batch_size"])))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark jalur deteksi IkanCheck")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--samples", nargs="*", default=["*.jpg", "*.png"])
+    parser.add_argument("--no-synthetic", action="store_true")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--threads", type=int, nargs="+", help="Jumlah thread inferensi yang diuji")
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--skip-model", action="store_true", help="Lewati tahap yang butuh model")
+    parser.add_argument("--model-only", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--out", help="Tulis JSON ke file (default: stdout)")
+    parser.add_argument("--baseline", help="JSON hasil benchmark sebelumnya untuk dibandingkan")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    args = parser.parse_args()
+
+    inputs = load_inputs(args.samples, [] if args.no_synthetic else SYNTHETIC_SIZES)
+    if not inputs:
+        parser.error("Tidak ada gambar input")
+
+    if args.model_only:
+        from backends import load_backend
+        threads = args.threads[0] if args.threads else None
+        model = load_backend(args.model, num_threads=threads)
+        arrays = [decode_tensor(data) for _, data in inputs]
+        print(json.dumps({"model": bench_model(model, arrays, args.batch_sizes, args.iterations, threads)}))
+        return
+
+    report = {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "model": args.model,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "inputs": [name for name, _ in inputs],
+            "iterations": args.iterations,
+        },
+        "stages": bench_cpu_stages(inputs, args.iterations),
+    }
+
+    if not args.skip_model:
+        from backends import load_backend
+        from prediction_cache import model_identity
+        report["meta"]["model_identity"] = model_identity(args.model)
+        if args.threads and len(args.threads) > 1:
+            report["model"] = [r for t in args.threads for r in _model_in_subprocess(args, t)]
+        threads = args.threads[0] if args.threads else None
+        model = load_backend(args.model, num_threads=threads)
+        if "model" not in report:
+            arrays = [decode_tensor(data) for _, data in inputs]
+            report["model"] = bench_model(model, arrays, args.batch_sizes, args.iterations, threads)
+        report["end_to_end"] = bench_end_to_end(model, inputs, args.iterations)
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["regressions"] = compare(report, json.load(f), args.tolerance)
+        exit_code = 1 if report["regressions"] else 0
+
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+"""Grafik hasil deteksi yang dipakai halaman Deteksi dan benchmark end-to-end."""
+from inference import class_labels
+
+
+def probability_figure(probabilities):
+    """Grafik batang horizontal probabilitas per kelas, terurut dari yang tertinggi."""
+    import pandas as pd
+    import plotly.express as px
+
+    df = pd.DataFrame({
+        'Kelas': list(class_labels.keys()),
+        'Probabilitas': probabilities
+    }).sort_values(by='Probabilitas', ascending=False)
+
+    fig = px.bar(
+        df, x='Probabilitas', y='Kelas', orientation='h',
+        title="Grafik Keyakinan per Kelas",
+        labels={'Probabilitas': 'Tingkat Keyakinan', 'Kelas': 'Jenis Penyakyt'},
+        text_auto='.2%'
+    )
+    fig.update_layout(xaxis_range=[0,1])
+    return fig
@@ -0,0 +1,342 @@
+"""Penyimpanan riwayat deteksi: gambar asli, thumbnail kecil, dan indeks SQLite berisi metadatanya."""
+import hashlib
+import io
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+import numpy as np
+from PIL import Image
+
+import metrics
+from inference import SOURCE_TRIAGE
+
+HISTORY_DIR = "riwayat_upload"
+DB_NAME = "riwayat.db"
+THUMB_DIRNAME = "thumbs"
+THUMB_SIZE = (320, 320)
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS detections (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT NOT NULL,
+    label TEXT NOT NULL,
+    confidence REAL,
+    probabilities BLOB,
+    source TEXT,
+    image_hash TEXT,
+    image_path TEXT NOT NULL UNIQUE,
+    thumb_path TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_detections_created ON detections (created_at);
+CREATE INDEX IF NOT EXISTS idx_detections_label_created ON detections (label, created_at);
+CREATE INDEX IF NOT EXISTS idx_detections_confidence ON detections (confidence);
+"""
+
+# Agregat analitik diperbarui oleh trigger setiap kali deteksi ditambah/dihapus,
+# sehingga dashboard cukup membaca tabel kecil ini tanpa memindai seluruh riwayat.
+LOW_CONFIDENCE = 0.6
+CONFIDENCE_BUCKETS = 20
+
+
+def _model_confidence(row=""):
+    # Statistik keyakinan hanya dari Xception: keyakinan hasil yang berhenti di triase berasal dari
+    # model triase, bukan dari vektor probabilitas Xception
+    prefix = f"{row}." if row else ""
+    return f"(CASE WHEN {prefix}source = '{SOURCE_TRIAGE}' THEN NULL ELSE {prefix}confidence END)"
+
+
+_NEW_CONF = _model_confidence("NEW")
+_OLD_CONF = _model_confidence("OLD")
+
+AGGREGATE_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS daily_stats (
+    day TEXT NOT NULL,
+    label TEXT NOT NULL,
+    n INTEGER NOT NULL DEFAULT 0,
+    n_low INTEGER NOT NULL DEFAULT 0,
+    n_conf INTEGER NOT NULL DEFAULT 0,
+    conf_sum REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, label)
+);
+CREATE TABLE IF NOT EXISTS confidence_hist (
+    label TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    n INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (label, bucket)
+);
+CREATE TRIGGER IF NOT EXISTS trg_detections_insert AFTER INSERT ON detections BEGIN
+    INSERT INTO daily_stats (day, label, n, n_low, n_conf, conf_sum)
+    VALUES (substr(NEW.created_at, 1, 10), NEW.label, 1,
+            COALESCE({_NEW_CONF} < {LOW_CONFIDENCE}, 0),
+            {_NEW_CONF} IS NOT NULL, COALESCE({_NEW_CONF}, 0))
+    ON CONFLICT (day, label) DO UPDATE SET
+        n = n + 1, n_low = n_low + excluded.n_low,
+        n_conf = n_conf + excluded.n_conf, conf_sum = conf_sum + excluded.conf_sum;
+    INSERT INTO confidence_hist (label, bucket, n)
+    SELECT NEW.label, CAST(MIN({_NEW_CONF}, 0.9999) * {CONFIDENCE_BUCKETS} AS INTEGER), 1
+    WHERE {_NEW_CONF} IS NOT NULL
+    ON CONFLICT (label, bucket) DO UPDATE SET n = n + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_detections_delete AFTER DELETE ON detections BEGIN
+    UPDATE daily_stats SET
+        n = n - 1,
+        n_low = n_low - COALESCE({_OLD_CONF} < {LOW_CONFIDENCE}, 0),
+        n_conf = n_conf - ({_OLD_CONF} IS NOT NULL),
+        conf_sum = conf_sum - COALESCE({_OLD_CONF}, 0)
+    WHERE day = substr(OLD.created_at, 1, 10) AND label = OLD.label;
+    UPDATE confidence_hist SET n = n - 1
+    WHERE {_OLD_CONF} IS NOT NULL AND label = OLD.label
+      AND bucket = CAST(MIN({_OLD_CONF}, 0.9999) * {CONFIDENCE_BUCKETS} AS INTEGER);
+END;
+"""
+
+_schema_lock = threading.Lock()
+_initialized = set()
+
+
+# ======================
+# Koneksi & Migrasi
+# ======================
+def connect(history_dir=HISTORY_DIR):
+    os.makedirs(history_dir, exist_ok=True)
+    db_path = os.path.join(history_dir, DB_NAME)
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    if db_path not in _initialized:
+        with _schema_lock:
+            if db_path not in _initialized:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(SCHEMA)
+                conn.executescript(AGGREGATE_SCHEMA)
+                _backfill_aggregates(conn)
+                _import_legacy_files(conn, history_dir)
+                _initialized.add(db_path)
+    return conn
+
+
+def parse_legacy_name(file_name):
+    # Format: {YYYYmmdd_HHMMSS}_{label}.jpg, atau {..}_{label}_{n}.jpg bila nama sudah terpakai
+    parts = os.path.splitext(file_name)[0].split('_')
+    try:
+        created = datetime.strptime(f"{parts[0]}_{parts[1]}", "%Y%m%d_%H%M%S")
+        if len(parts) > 3 and parts[-1].isdigit():
+            parts = parts[:-1]
+        label = "_".join(parts[2:])
+    except (ValueError, IndexError):
+        created = None
+        label = os.path.splitext(file_name)[0]
+    return created, label
+
+
+def _backfill_aggregates(conn):
+    """Isi tabel agregat untuk database yang dibuat sebelum trigger analitik ada."""
+    if conn.execute("SELECT 1 FROM daily_stats LIMIT 1").fetchone():
+        return
+    confidence = _model_confidence()
+    with conn:
+        conn.execute(f"""
+            INSERT INTO daily_stats (day, label, n, n_low, n_conf, conf_sum)
+            SELECT substr(created_at, 1, 10), label, COUNT(*),
+                   SUM(COALESCE({confidence} < {LOW_CONFIDENCE}, 0)),
+                   COUNT({confidence}), COALESCE(SUM({confidence}), 0)
+            FROM detections GROUP BY 1, 2
+        """)
+        conn.execute(f"""
+            INSERT INTO confidence_hist (label, bucket, n)
+            SELECT label, CAST(MIN({confidence}, 0.9999) * {CONFIDENCE_BUCKETS} AS INTEGER), COUNT(*)
+            FROM detections WHERE {confidence} IS NOT NULL GROUP BY 1, 2
+        """)
+
+
+def _import_legacy_files(conn, history_dir):
+    """Daftarkan gambar riwayat lama (sebelum ada database) agar tetap tampil di halaman Riwayat."""
+    known = {row[0] for row in conn.execute("SELECT image_path FROM detections")}
+    rows = []
+    for file_name in list_files(history_dir):
+        image_path = os.path.join(history_dir, file_name)
+        if image_path in known:
+            continue
+        created, label = parse_legacy_name(file_name)
+        if created is None:
+            created = datetime.fromtimestamp(os.path.getmtime(image_path))
+        rows.append((created.strftime(TIME_FORMAT), label, image_path, thumb_path(image_path)))
+    if rows:
+        with conn:
+            conn.executemany(
+                "INSERT INTO detections (created_at, label, image_path, thumb_path) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+
+
+# ======================
+# Gambar & Thumbnail
+# ======================
+def thumb_path(image_path):
+    head, name = os.path.split(image_path)
+    return os.path.join(head, THUMB_DIRNAME, name)
+
+
+def _write_thumbnail(img, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    thumb = img.convert("RGB")
+    thumb.thumbnail(THUMB_SIZE)
+    thumb.save(path, format="JPEG", quality=80, optimize=True)
+
+
+def ensure_thumbnail(image_path):
+    """Path thumbnail untuk `image_path`; dibuat saat itu juga untuk riwayat lama yang belum punya."""
+    path = thumb_path(image_path)
+    if not os.path.exists(path):
+        with Image.open(image_path) as img:
+            img.draft("RGB", THUMB_SIZE)
+            _write_thumbnail(img, path)
+    return path
+
+
+def list_files(history_dir=HISTORY_DIR):
+    """Nama file gambar di folder riwayat, terbaru lebih dulu."""
+    try:
+        with os.scandir(history_dir) as entries:
+            names = [e.name for e in entries if e.is_file() and e.name.lower().endswith(IMAGE_EXTENSIONS)]
+    except FileNotFoundError:
+        return []
+    return sorted(names, reverse=True)
+
+
+# ======================
+# Tulis, Baca & Hapus
+# ======================
+def _claim_path(history_dir, stem, data):
+    """Tulis `data` ke nama file unik; nama diklaim atomik ("xb") karena beberapa worker penyimpanan
+    bisa menyimpan label yang sama di detik yang sama."""
+    n = 0
+    while True:
+        path = os.path.join(history_dir, f"{stem}_{n}.jpg" if n else f"{stem}.jpg")
+        try:
+            with open(path, "xb") as f:
+                f.write(data)
+            return path
+        except FileExistsError:
+            n += 1
+
+
+def save_detection(img, result, history_dir=HISTORY_DIR):
+    """Simpan gambar asli, thumbnail, dan metadata `result` (Prediction); kembalikan id baris."""
+    # Inisialisasi database (termasuk impor file lama) sebelum file baru ditulis ke folder riwayat
+    conn = connect(history_dir)
+    try:
+        now = datetime.now()
+        with metrics.timer("history_save_seconds"):
+            # JPEG tidak mendukung alpha, jadi PNG RGBA/P dikonversi dulu ke RGB
+            buf = io.BytesIO()
+            img.convert("RGB").save(buf, format="JPEG", quality=90)
+            data = buf.getvalue()
+            save_path = _claim_path(history_dir, f"{now.strftime('%Y%m%d_%H%M%S')}_{result.label}", data)
+            thumb = thumb_path(save_path)
+            _write_thumbnail(img, thumb)
+        image_hash = hashlib.sha256(data).hexdigest()
+
+        with conn:
+            cur = conn.execute(
+                "INSERT INTO detections (created_at, label, confidence, probabilities, source, image_hash, "
+                "image_path, thumb_path) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (now.strftime(TIME_FORMAT), result.label, float(result.confidence),
+                 np.asarray(result.probabilities, dtype=np.float32).tobytes(), result.source,
+                 image_hash, save_path, thumb),
+            )
+        return cur.lastrowid
+    finally:
+        conn.close()
+
+
+def _where(labels=None, start=None, end=None, min_confidence=None):
+    clauses, params = [], []
+    if labels:
+        clauses.append(f"label IN ({', '.join('?' * len(labels))})")
+        params.extend(labels)
+    if start is not None:
+        clauses.append("created_at >= ?")
+        params.append(start.strftime(TIME_FORMAT))
+    if end is not None:
+        clauses.append("created_at < ?")
+        params.append(end.strftime(TIME_FORMAT))
+    if min_confidence:
+        clauses.append("confidence >= ?")
+        params.append(min_confidence)
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def count_detections(history_dir=HISTORY_DIR, **filters):
+    where, params = _where(**filters)
+    conn = connect(history_dir)
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM detections{where}", params).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def query_detections(history_dir=HISTORY_DIR, limit=12, offset=0, **filters):
+    """Baris riwayat terbaru lebih dulu, difilter per kelas, rentang waktu [start, end) dan keyakinan."""
+    where, params = _where(**filters)
+    conn = connect(history_dir)
+    try:
+        rows = conn.execute(
+            f"SELECT id, created_at, label, confidence, image_hash, image_path, thumb_path "
+            f"FROM detections{where} ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?",
+            params + [limit, offset],
+        ).fetchall()
+        return [dict(r) for r in rows]
+    finally:
+        conn.close()
+
+
+def delete_detection(detection_id, history_dir=HISTORY_DIR):
+    conn = connect(history_dir)
+    try:
+        row = conn.execute(
+            "SELECT image_path, thumb_path FROM detections WHERE id = ?", (detection_id,)
+        ).fetchone()
+        if row is None:
+            return
+        with conn:
+            conn.execute("DELETE FROM detections WHERE id = ?", (detection_id,))
+    finally:
+        conn.close()
+    for path in (row["image_path"], row["thumb_path"]):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+# ======================
+# Analitik
+# ======================
+def daily_stats(start=None, history_dir=HISTORY_DIR):
+    """Agregat harian per kelas (day, label, n, n_low, n_conf, conf_sum) sejak tanggal `start`."""
+    conn = connect(history_dir)
+    try:
+        sql = "SELECT day, label, n, n_low, n_conf, conf_sum FROM daily_stats WHERE n > 0"
+        params = []
+        if start is not None:
+            sql += " AND day >= ?"
+            params.append(start.strftime("%Y-%m-%d"))
+        return [dict(r) for r in conn.execute(sql + " ORDER BY day", params)]
+    finally:
+        conn.close()
+
+
+def confidence_histogram(history_dir=HISTORY_DIR):
+    """Histogram keyakinan per kelas: (label, batas bawah bucket, n)."""
+    conn = connect(history_dir)
+    try:
+        return [
+            {"label": r["label"], "bucket": r["bucket"] / CONFIDENCE_BUCKETS, "n": r["n"]}
+            for r in conn.execute("SELECT label, bucket, n FROM confidence_hist WHERE n > 0 ORDER BY bucket")
+        ]
+    finally:
+        conn.close()
@@ -0,0 +1,303 @@
+"""Preprocessing dan inferensi yang dipakai bersama oleh aplikasi Streamlit dan layanan lain."""
+import os
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
+
+import numpy as np
+
+import metrics
+from model_registry import INPUT_SIZE
+
+class_labels = {
+    "Bacterial Red disease": 0,
+    "Bacterial diseases - Aeromoniasis": 1,
+    "Bacterial gill disease": 2,
+    "Fungal diseases Saprolegniasis": 3,
+    "Healthy Fish": 4,
+    "Parasitic diseases": 5,
+    "Viral diseases White tail disease": 6
+}
+idx_to_class = {v: k for k, v in class_labels.items()}
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+BATCH_SIZE = 32
+
+# Sumber vektor probabilitas: model utama (Xception), atau model triase kaskade (lihat triage.py)
+SOURCE_MODEL = "xception"
+SOURCE_TRIAGE = "triage"
+
+# Estimasi biaya terakhir yang terukur per model (detik): satu view tunggal, dan per view di batch TTA.
+# Kunci id(model): model berasal dari registry/cache_resource dan hidup selama proses.
+_costs = {}
+
+
+def _model_cost(model):
+    return _costs.setdefault(id(model), {"single": None, "tta_per_view": None})
+
+
+@dataclass
+class Prediction:
+    probabilities: np.ndarray  # urut sesuai indeks class_labels
+    top_k: list                # [(label, probabilitas), ...] terurut menurun
+    timings: dict = field(default_factory=dict)
+    cached: bool = False
+    source: str = SOURCE_MODEL
+
+    @property
+    def label(self):
+        return self.top_k[0][0]
+
+    @property
+    def confidence(self):
+        return self.top_k[0][1]
+
+
+# ======================
+# Preprocessing
+# ======================
+def preprocess(img):
+    """Ubah PIL Image menjadi array float32 (299, 299, 3) berskala 0-1."""
+    # convert("RGB") menyamakan PNG RGBA / grayscale menjadi 3 kanal
+    img = img.convert("RGB").resize(INPUT_SIZE)
+    return np.asarray(img, dtype=np.float32) / 255.0
+
+
+def top_k_from(probs, k=3):
+    order = np.argsort(probs)[::-1][:k]
+    return [(idx_to_class[int(i)], float(probs[i])) for i in order]
+
+
+# ======================
+# Inferensi
+# ======================
+def predict_batch(model, batch, batch_size=None):
+    """`model.predict` untuk satu batch, beserta sumber tiap baris (kaskade triase bisa berhenti lebih awal)."""
+    if hasattr(model, "predict_with_source"):
+        return model.predict_with_source(batch, batch_size=batch_size)
+    out = model.predict(batch, batch_size=batch_size, verbose=0)
+    return out, [SOURCE_MODEL] * len(out)
+
+
+def predict_array(model, x, top_k=3, cache=None):
+    """Satu forward pass untuk satu array hasil `preprocess`; dilewati bila ada di `cache`."""
+    start = time.perf_counter()
+    key = cache.key(x) if cache is not None else None
+    entry = cache.get(key) if cache is not None else None
+    cached = entry is not None
+    if cache is not None:
+        metrics.inc("prediction_cache_total", result="hit" if cached else "miss")
+    if cached:
+        probs, source = entry
+    else:
+        model_start = time.perf_counter()
+        with metrics.timer("model_predict_seconds", batch="1"):
+            out, sources = predict_batch(model, x[np.newaxis, ...])
+        probs, source = out[0], sources[0]
+        _model_cost(model)["single"] = time.perf_counter() - model_start
+        if cache is not None:
+            cache.put(key, probs, source)
+    predict_seconds = time.perf_counter() - start
+    return Prediction(
+        probabilities=probs,
+        top_k=top_k_from(probs, top_k),
+        timings={"predict": predict_seconds},
+        cached=cached,
+        source=source,
+    )
+
+
+def predict(model, img, top_k=3, cache=None):
+    """Preprocess + satu forward pass; hasilnya memuat vektor probabilitas lengkap."""
+    start = time.perf_counter()
+    x = preprocess(img)
+    preprocess_seconds = time.perf_counter() - start
+    metrics.observe("preprocess_seconds", preprocess_seconds)
+
+    result = predict_array(model, x, top_k=top_k, cache=cache)
+    result.timings["preprocess"] = preprocess_seconds
+    result.timings["total"] = preprocess_seconds + result.timings["predict"]
+    return result
+
+
+# ======================
+# Test-Time Augmentation & Tiling
+# ======================
+TTA_MAX_VIEWS = 10
+
+
+def tta_views(img, n_views=TTA_MAX_VIEWS):
+    """View untuk TTA, urut prioritas: utuh, flip, crop tengah, lalu 4 tile pojok (+ flip-nya)."""
+    from PIL import ImageOps
+
+    img = img.convert("RGB")
+    w, h = img.size
+    # Tile 60% sisi gambar dengan overlap, agar lesi kecil terlihat lebih besar di input 299x299
+    tw, th = int(w * 0.6), int(h * 0.6)
+    center = img.crop(((w - tw) // 2, (h - th) // 2, (w + tw) // 2, (h + th) // 2))
+    tiles = [img.crop((x, y, x + tw, y + th)) for x, y in ((0, 0), (w - tw, 0), (0, h - th), (w - tw, h - th))]
+
+    views = [img, ImageOps.mirror(img), center, *tiles, ImageOps.mirror(center), *map(ImageOps.mirror, tiles)]
+    return views[:max(1, n_views)]
+
+
+def predict_tta(model, img, n_views=8, latency_budget=None, aggregate="mean", top_k=3):
+    """Prediksi beberapa view sebagai satu batch lalu gabungkan probabilitasnya.
+
+    `latency_budget` (detik) membatasi jumlah view berdasarkan biaya per view yang terakhir terukur
+    untuk model ini. Bila model ini belum punya baseline satu view, view utuh diprediksi sendiri lebih
+    dulu sebagai baseline; sebelum ada ukuran per view di batch, biaya satu view dipakai sebagai
+    estimasi (batas atas). `aggregate="max"` mengambil probabilitas tertinggi per kelas (lalu
+    dinormalisasi), berguna bila lesi hanya terlihat di satu tile.
+    """
+    cost = _model_cost(model)
+    views = tta_views(img, n_views)
+
+    start = time.perf_counter()
+    arrays = [preprocess(views[0])]
+    preprocess_seconds = time.perf_counter() - start
+
+    outs, sources, predict_seconds = [], [], 0.0
+    if cost["single"] is None:
+        start = time.perf_counter()
+        with metrics.timer("model_predict_seconds", batch="1"):
+            out, row_sources = predict_batch(model, arrays[0][np.newaxis, ...])
+        cost["single"] = predict_seconds = time.perf_counter() - start
+        outs.append(out)
+        sources += row_sources
+
+    n_total = len(views)
+    if latency_budget is not None:
+        per_view = cost["tta_per_view"] or cost["single"]
+        n_more = int((latency_budget - predict_seconds) / per_view) if per_view else n_total
+        n_total = max(1, min(n_total, len(outs) + max(0, n_more)))
+
+    if n_total > len(outs):
+        start = time.perf_counter()
+        arrays += [preprocess(v) for v in views[len(arrays):n_total]]
+        batch = np.stack(arrays[len(outs):n_total])
+        preprocess_seconds += time.perf_counter() - start
+
+        start = time.perf_counter()
+        with metrics.timer("model_predict_seconds", batch="tta"):
+            out, row_sources = predict_batch(model, batch, batch_size=len(batch))
+        batch_seconds = time.perf_counter() - start
+        cost["tta_per_view"] = batch_seconds / len(batch)
+        predict_seconds += batch_seconds
+        outs.append(out)
+        sources += row_sources
+    out = np.concatenate(outs)
+
+    if aggregate == "max":
+        probs = out.max(axis=0)
+        probs = probs / probs.sum()
+    else:
+        probs = out.mean(axis=0)
+
+    timings = {
+        "preprocess": preprocess_seconds,
+        "predict": predict_seconds,
+        "total": preprocess_seconds + predict_seconds,
+        "views": len(out),
+        # Perbandingan terhadap satu view biasa dengan model yang sama
+        "baseline_predict": cost["single"],
+        "cost_ratio": predict_seconds / cost["single"],
+    }
+    # Bila satu view saja berhenti di triase, gabungannya ikut memuat vektor buatan kaskade
+    source = SOURCE_TRIAGE if SOURCE_TRIAGE in sources else SOURCE_MODEL
+    return Prediction(probabilities=probs, top_k=top_k_from(probs, top_k), timings=timings, source=source)
+
+
+# ======================
+# Inferensi Batch
+# ======================
+def iter_image_sources(files):
+    """Hasilkan pasangan (nama, bytes) dari daftar file unggahan; arsip .zip dibuka per entri.
+
+    Entri zip yang melebihi batas unggahan tidak dibaca; sebagai gantinya dihasilkan IngestError
+    yang dilaporkan `predict_many` sebagai error untuk entri tersebut.
+    """
+    from ingest import MAX_UPLOAD_BYTES, IngestError
+
+    for f in files:
+        if f.name.lower().endswith(".zip"):
+            with zipfile.ZipFile(f) as zf:
+                for entry in _zip_images(zf):
+                    name = os.path.basename(entry.filename)
+                    if entry.file_size > MAX_UPLOAD_BYTES:
+                        yield name, IngestError(f"Ukuran file melebihi {MAX_UPLOAD_BYTES / 2**20:.0f} MB")
+                    else:
+                        yield name, zf.read(entry)
+        else:
+            yield f.name, f.getvalue()
+
+
+def count_image_sources(files):
+    """Jumlah gambar yang akan dihasilkan `iter_image_sources`; arsip zip hanya dibaca direktorinya."""
+    total = 0
+    for f in files:
+        if f.name.lower().endswith(".zip"):
+            with zipfile.ZipFile(f) as zf:
+                total += len(_zip_images(zf))
+        else:
+            total += 1
+    return total
+
+
+def _zip_images(zf):
+    return [e for e in zf.infolist() if not e.is_dir() and e.filename.lower().endswith(IMAGE_EXTENSIONS)]
+
+
+def _decode(data):
+    # Decode + preprocess; dijalankan di thread pool (PIL melepas GIL saat decode)
+    from ingest import decode_tensor
+    if isinstance(data, Exception):
+        return None, str(data)
+    try:
+        return decode_tensor(data), None
+    except Exception as e:
+        return None, str(e)
+
+
+def predict_many(model, sources, batch_size=BATCH_SIZE, max_workers=None, cache=None):
+    """Decode paralel lalu prediksi per batch berukuran tetap.
+
+    `sources` adalah iterable (nama, bytes atau path file). Menghasilkan (nama, probabilitas, error)
+    per gambar. Decode batch berikutnya berjalan selagi model memproses batch saat ini, sehingga
+    paling banyak dua batch berada di memori. Gambar yang ada di `cache` tidak ikut dikirim ke model.
+    """
+    sources = iter(sources)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        def submit_next():
+            chunk = list(islice(sources, batch_size))
+            return chunk, [pool.submit(_decode, data) for _, data in chunk]
+
+        upcoming = submit_next()
+        while True:
+            chunk, futures = upcoming
+            if not chunk:
+                break
+            upcoming = submit_next()
+            decoded = [f.result() for f in futures]
+            valid = [i for i, (x, _) in enumerate(decoded) if x is not None]
+            probs, keys = {}, {}
+            if cache is not None:
+                for i in valid:
+                    keys[i] = cache.key(decoded[i][0])
+                    hit = cache.get(keys[i])
+                    metrics.inc("prediction_cache_total", result="hit" if hit is not None else "miss")
+                    if hit is not None:
+                        probs[i] = hit[0]
+            pending = [i for i in valid if i not in probs]
+            if pending:
+                batch = np.stack([decoded[i][0] for i in pending])
+                with metrics.timer("model_predict_seconds", batch="many"):
+                    out, row_sources = predict_batch(model, batch, batch_size=batch_size)
+                for i, p, source in zip(pending, out, row_sources):
+                    probs[i] = p
+                    if cache is not None:
+                        cache.put(keys[i], p, source)
+            for i, (name, _) in enumerate(chunk):
+                yield name, probs.get(i), decoded[i][1]
@@ -0,0 +1,123 @@
+"""Tahap ingest unggahan: batas ukuran, decode JPEG resolusi rendah (draft), orientasi EXIF dan mode warna.
+
+Foto 48 MP tidak pernah di-decode penuh; memori puncak per permintaan dibatasi oleh `display_size`,
+bukan oleh kamera yang dipakai. Tensor model selalu dibuat lewat `decode_tensor` dengan draft yang
+sama, sehingga satu gambar menghasilkan tensor (dan kunci cache) yang sama di UI, batch, API & skrip.
+"""
+import io
+import os
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+from PIL import Image, ImageOps
+
+import metrics
+from model_registry import INPUT_SIZE
+
+MAX_UPLOAD_BYTES = 25 * 2**20
+MAX_PIXELS = 60_000_000
+DISPLAY_SIZE = 1024
+# Draft decode untuk tensor model: JPEG di-decode pada skala terkecil yang masih >= input model
+TENSOR_DRAFT_SIZE = INPUT_SIZE[0]
+
+
+class IngestError(ValueError):
+    pass
+
+
+@dataclass
+class Ingested:
+    display: Image.Image        # salinan RGB maksimal DISPLAY_SIZE untuk tampilan & riwayat
+    tensor: np.ndarray          # float32 (299, 299, 3) siap untuk model
+    original_size: tuple
+    timings: dict = field(default_factory=dict)
+
+
+def _byte_size(source):
+    if isinstance(source, (bytes, bytearray)):
+        return len(source)
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.getsize(source)
+    pos = source.tell()
+    source.seek(0, io.SEEK_END)
+    size = source.tell()
+    source.seek(pos)
+    return size
+
+
+def _rewind(source):
+    if hasattr(source, "seek"):
+        source.seek(0)
+
+
+def open_image(source, draft_size, max_bytes=MAX_UPLOAD_BYTES, max_pixels=MAX_PIXELS):
+    """Buka & decode gambar (bytes, file-like atau path) dengan batas byte/piksel, minimal `draft_size`,
+    RGB dan sudah tegak."""
+    img, original_size, _ = _open(source, draft_size, max_bytes, max_pixels)
+    return img, original_size
+
+
+def _open(source, draft_size, max_bytes, max_pixels):
+    # Seperti open_image, ditambah format file asli (draft hanya berpengaruh pada JPEG)
+    if _byte_size(source) > max_bytes:
+        raise IngestError(f"Ukuran file melebihi {max_bytes / 2**20:.0f} MB")
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+
+    try:
+        img = Image.open(source)
+    except Exception as e:
+        raise IngestError(f"Format gambar tidak dikenali ({e})") from e
+    original_size = img.size
+    fmt = img.format
+    # Header sudah dibaca tetapi piksel belum: tolak gambar raksasa sebelum dialokasikan
+    if img.width * img.height > max_pixels:
+        raise IngestError(f"Resolusi {img.width}x{img.height} melebihi batas {max_pixels / 1e6:.0f} MP")
+
+    # JPEG di-decode langsung pada skala 1/2, 1/4 atau 1/8 selama hasilnya >= draft_size
+    img.draft("RGB", (draft_size, draft_size))
+    try:
+        img = ImageOps.exif_transpose(img)
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        img.load()
+    except Exception as e:
+        raise IngestError(f"Gambar rusak atau tidak lengkap ({e})") from e
+    return img, original_size, fmt
+
+
+def decode_tensor(source, max_bytes=MAX_UPLOAD_BYTES, max_pixels=MAX_PIXELS):
+    """Bytes, file-like atau path menjadi tensor float32 (299, 299, 3) untuk model."""
+    from inference import preprocess
+
+    img, _ = open_image(source, draft_size=TENSOR_DRAFT_SIZE, max_bytes=max_bytes, max_pixels=max_pixels)
+    return preprocess(img)
+
+
+def ingest(source, display_size=DISPLAY_SIZE):
+    """Ubah unggahan menjadi satu tensor untuk inferensi dan satu salinan berukuran terbatas."""
+    from inference import preprocess
+
+    start = time.perf_counter()
+    img, original_size, fmt = _open(source, display_size, MAX_UPLOAD_BYTES, MAX_PIXELS)
+    decode_seconds = time.perf_counter() - start
+    metrics.observe("upload_decode_seconds", decode_seconds)
+
+    start = time.perf_counter()
+    if fmt == "JPEG" and display_size != TENSOR_DRAFT_SIZE:
+        # Skala draft untuk tampilan berbeda dengan untuk tensor; decode kedua pada skala kecil ini murah
+        _rewind(source)
+        tensor = decode_tensor(source)
+    else:
+        tensor = preprocess(img)
+    preprocess_seconds = time.perf_counter() - start
+    metrics.observe("preprocess_seconds", preprocess_seconds)
+
+    img.thumbnail((display_size, display_size))
+    return Ingested(
+        display=img,
+        tensor=tensor,
+        original_size=original_size,
+        timings={"decode": decode_seconds, "preprocess": preprocess_seconds},
+    )
@@ -0,0 +1,93 @@
+"""Antrian job latar belakang: inferensi dan penyimpanan riwayat tidak berjalan di thread script Streamlit."""
+import logging
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import metrics
+from inference import predict, predict_array, predict_tta
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Job:
+    id: str
+    done: bool = False
+    result: object = None
+    error: str = None
+
+
+class JobQueue:
+    """Worker pool untuk deteksi, plus pool terpisah untuk penulisan riwayat (fire-and-forget).
+
+    Penulisan disk dipisah agar satu simpanan PNG besar yang lambat tidak menahan inferensi sesi lain.
+    """
+
+    def __init__(self, inference_workers=2, persist_workers=2, max_jobs=256):
+        self._inference = ThreadPoolExecutor(inference_workers, thread_name_prefix="deteksi")
+        self._persist = ThreadPoolExecutor(persist_workers, thread_name_prefix="riwayat")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_jobs = max_jobs
+
+    def _register(self):
+        job = Job(id=uuid.uuid4().hex)
+        with self._lock:
+            self._jobs[job.id] = job
+            # Buang job lama yang sudah selesai tetapi hasilnya tidak pernah diambil lagi; job yang
+            # masih berjalan tetap disimpan karena sesinya masih melakukan polling
+            excess = len(self._jobs) - self.max_jobs
+            if excess > 0:
+                for old_id in [j.id for j in self._jobs.values() if j.done][:excess]:
+                    del self._jobs[old_id]
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def persist(self, fn, *args, **kwargs):
+        """Jalankan penulisan di background tanpa ditunggu; kegagalan hanya dicatat di log."""
+        def run():
+            try:
+                fn(*args, **kwargs)
+            except Exception:
+                metrics.inc("persist_failures_total")
+                logger.exception("Gagal menyimpan riwayat")
+        self._persist.submit(run)
+
+    def submit_detection(self, model, img, x=None, timings=None, cache=None, on_result=None, tta=None):
+        """Antrekan deteksi untuk `img`; `on_result(img, result)` dijadwalkan ke pool penulisan.
+
+        Bila `x` (tensor hasil ingest) diberikan, preprocessing tidak diulang; `timings` dari tahap
+        ingest digabung ke hasil. `tta` (dict argumen `predict_tta`) mengaktifkan mode multi-view.
+        """
+        job = self._register()
+        metrics.inc("jobs_submitted_total")
+
+        def run():
+            try:
+                with metrics.timer("job_detection_seconds"):
+                    if tta is not None:
+                        result = predict_tta(model, img, **tta)
+                    elif x is None:
+                        result = predict(model, img, cache=cache)
+                    else:
+                        result = predict_array(model, x, cache=cache)
+                        result.timings.update(timings or {})
+                        result.timings["total"] = sum(
+                            result.timings.get(k, 0.0) for k in ("decode", "preprocess", "predict"))
+                if on_result is not None:
+                    self.persist(on_result, img, result)
+                job.result = result
+            except Exception as e:
+                logger.exception("Deteksi gagal")
+                job.error = str(e)
+            finally:
+                job.done = True
+
+        self._inference.submit(run)
+        return job.id
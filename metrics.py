@@ -0,0 +1,117 @@
+"""Metrik tingkat proses (counter & histogram) dengan ekspor format teks Prometheus."""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Dipakai bila waktu mulai proses tidak bisa dibaca dari /proc
+_IMPORT_TIME = time.time()
+
+# Batas bucket histogram dalam detik
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+
+
+def process_start_time():
+    """Epoch saat proses dimulai (Linux: /proc), atau saat modul ini pertama diimpor."""
+    try:
+        with open("/proc/self/stat") as f:
+            # Field ke-22 (starttime) dalam clock tick sejak boot; nama proses bisa mengandung spasi
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return time.time() - uptime + int(fields[19]) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return _IMPORT_TIME
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def inc(name, amount=1, **labels):
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def observe(name, seconds, **labels):
+    key = _key(name, labels)
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = {"buckets": [0] * len(BUCKETS), "sum": 0.0, "count": 0}
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                hist["buckets"][i] += 1
+        hist["sum"] += seconds
+        hist["count"] += 1
+
+
+@contextmanager
+def timer(name, **labels):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+def _fmt_labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+
+def snapshot():
+    """Salinan counter & histogram untuk ditampilkan di UI."""
+    with _lock:
+        counters = {k: v for k, v in _counters.items()}
+        histograms = {k: {"buckets": list(v["buckets"]), "sum": v["sum"], "count": v["count"]}
+                      for k, v in _histograms.items()}
+    return counters, histograms
+
+
+def render_prometheus():
+    counters, histograms = snapshot()
+    lines = []
+    for name in sorted({n for n, _ in counters}):
+        lines.append(f"# TYPE {name} counter")
+        for (n, labels), value in sorted(counters.items()):
+            if n == name:
+                lines.append(f"{name}{_fmt_labels(labels)} {value}")
+    for name in sorted({n for n, _ in histograms}):
+        lines.append(f"# TYPE {name} histogram")
+        for (n, labels), hist in sorted(histograms.items()):
+            if n != name:
+                continue
+            for bound, count in zip(BUCKETS, hist["buckets"]):
+                lines.append(f"{name}_bucket{_fmt_labels(labels, [('le', bound)])} {count}")
+            lines.append(f"{name}_bucket{_fmt_labels(labels, [('le', '+Inf')])} {hist['count']}")
+            lines.append(f"{name}_sum{_fmt_labels(labels)} {hist['sum']}")
+            lines.append(f"{name}_count{_fmt_labels(labels)} {hist['count']}")
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics_file(path):
+    """Tulis metrik secara atomik (cocok untuk textfile collector node_exporter)."""
+    # Nama sementara per thread: setiap sesi Streamlit menulis dari thread-nya sendiri
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(render_prometheus())
+    os.replace(tmp, path)
+
+
+def quantile(hist, q):
+    """Perkiraan kuantil dari bucket histogram (batas atas bucket yang memuat kuantil)."""
+    if not hist["count"]:
+        return None
+    target = q * hist["count"]
+    for bound, count in zip(BUCKETS, hist["buckets"]):
+        if count >= target:
+            return bound
+    return float("inf")
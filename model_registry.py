@@ -0,0 +1,93 @@
+"""Registry model tingkat proses: model dimuat sekali lalu dipakai bersama semua sesi."""
+import os
+import threading
+import time
+
+import metrics
+
+INPUT_SIZE = (299, 299)
+
+_lock = threading.Lock()
+_models = {}
+_info = {}
+
+
+# ======================
+# Utilitas Memori
+# ======================
+def _rss_bytes():
+    # Resident set size proses saat ini (Linux: /proc, lainnya: fallback ke resource)
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        try:
+            import resource
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        except ImportError:
+            return 0
+
+
+# ======================
+# Pemuatan & Pemanasan Model
+# ======================
+def _load_and_warm(path, num_threads=None):
+    import numpy as np
+    from backends import load_backend, weight_bytes
+
+    rss_before = _rss_bytes()
+    start = time.perf_counter()
+    model = load_backend(path, num_threads=num_threads)
+    load_seconds = time.perf_counter() - start
+    # Bila counter ini naik lebih dari sekali per proses, model sedang dimuat ulang
+    metrics.inc("model_loads_total")
+    metrics.observe("model_load_seconds", load_seconds)
+
+    # Warm-up dengan batch dummy agar prediksi pertama pengguna tidak menanggung biaya inisialisasi graph
+    start = time.perf_counter()
+    model.predict(np.zeros((1, *INPUT_SIZE, 3), dtype=np.float32), verbose=0)
+    warmup_seconds = time.perf_counter() - start
+
+    info = {
+        "path": path,
+        "load_seconds": load_seconds,
+        "warmup_seconds": warmup_seconds,
+        "param_bytes": weight_bytes(model),
+        "num_threads": num_threads,
+        "rss_delta_bytes": max(_rss_bytes() - rss_before, 0),
+        "loaded_at": time.time(),
+        # Waktu sejak proses dimulai hingga model siap dipakai (untuk mengukur cold start)
+        "ready_after_start_seconds": time.time() - metrics.process_start_time(),
+    }
+    metrics.observe("model_ready_seconds", info["ready_after_start_seconds"])
+    return model, info
+
+
+def get_model(path, num_threads=None):
+    """Kembalikan instance model untuk `path`, memuatnya hanya pada pemanggilan pertama.
+
+    File .tflite dimuat lewat TFLiteBackend, selain itu sebagai model Keras (lihat backends.py).
+    """
+    model = _models.get(path)
+    if model is not None:
+        return model
+    with _lock:
+        if path not in _models:
+            _models[path], _info[path] = _load_and_warm(path, num_threads=num_threads)
+        return _models[path]
+
+
+def preload(path, num_threads=None):
+    """Mulai memuat model di thread background; halaman yang butuh model cukup memanggil get_model."""
+    thread = threading.Thread(target=get_model, args=(path, num_threads), name="preload-model", daemon=True)
+    thread.start()
+    return thread
+
+
+def model_info(path):
+    """Statistik pemuatan (waktu & memori) untuk model yang sudah dimuat, atau None."""
+    return _info.get(path)
+
+
+def is_ready(path):
+    return path in _models
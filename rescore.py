@@ -0,0 +1,184 @@
+"""Skor ulang seluruh arsip riwayat dengan model baru, lalu ekspor ke CSV/Parquet.
+
+Gambar di-decode paralel dan diprediksi per batch, dengan memori terbatas pada dua batch sekaligus.
+Hasil ditulis sebagai file part berurutan. Checkpoint dicatat setiap part selesai, sehingga job yang
+terhenti bisa dilanjutkan dengan perintah yang sama.
+
+    python rescore.py --model model_baru.h5 --out rescore_out --format parquet
+    python rescore.py --model model_baru.h5 --out rescore_out     # lanjut dari checkpoint
+"""
+import argparse
+import csv
+import json
+import os
+import time
+
+import numpy as np
+
+from history import DB_NAME, HISTORY_DIR, parse_legacy_name, list_files
+from inference import BATCH_SIZE, class_labels, idx_to_class, predict_many
+from prediction_cache import model_identity
+
+CHECKPOINT_NAME = "checkpoint.json"
+PROB_COLUMNS = [f"p_{name}" for name in class_labels]
+
+
+# ======================
+# Checkpoint
+# ======================
+def load_checkpoint(out_dir, model_id):
+    # `model_id` memuat ukuran & mtime file, jadi model baru yang menimpa path lama tidak melanjutkan
+    # checkpoint model sebelumnya
+    path = os.path.join(out_dir, CHECKPOINT_NAME)
+    if not os.path.exists(path):
+        return {"model": model_id, "last_file": "", "processed": 0, "next_part": 0, "total": 0,
+                "agree": 0, "failed": 0, "confusion": {}}
+    with open(path) as f:
+        checkpoint = json.load(f)
+    if checkpoint["model"] != model_id:
+        raise SystemExit(f"Checkpoint di {out_dir} dibuat untuk model lain ({checkpoint['model']}); "
+                         f"gunakan folder output lain atau hapus folder tersebut")
+    return checkpoint
+
+
+def save_checkpoint(out_dir, checkpoint):
+    path = os.path.join(out_dir, CHECKPOINT_NAME)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(tmp, path)
+
+
+# ======================
+# Output
+# ======================
+def write_part(out_dir, part, rows, fmt):
+    """Tulis satu part; nama part tetap sehingga menulis ulang setelah crash tidak menduplikasi baris."""
+    columns = ["file", "created_at", "old_label", "new_label", "new_confidence", "agree", "error", *PROB_COLUMNS]
+    path = os.path.join(out_dir, f"part-{part:05d}.{fmt}")
+    if fmt == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        table = pa.Table.from_pylist(rows, schema=pa.schema(
+            [("file", pa.string()), ("created_at", pa.string()), ("old_label", pa.string()),
+             ("new_label", pa.string()), ("new_confidence", pa.float32()), ("agree", pa.bool_()),
+             ("error", pa.string())] + [(c, pa.float32()) for c in PROB_COLUMNS]
+        ))
+        pq.write_table(table, f"{path}.tmp", compression="zstd")
+    else:
+        with open(f"{path}.tmp", "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=columns)
+            writer.writeheader()
+            writer.writerows(rows)
+    os.replace(f"{path}.tmp", path)
+    return path
+
+
+def _old_labels(history_dir):
+    # Label lama dari database riwayat bila ada; selain itu dari nama file
+    db_path = os.path.join(history_dir, DB_NAME)
+    if not os.path.exists(db_path):
+        return {}
+    import sqlite3
+    conn = sqlite3.connect(db_path)
+    try:
+        return {os.path.basename(path): (label, created)
+                for path, label, created in conn.execute("SELECT image_path, label, created_at FROM detections")}
+    finally:
+        conn.close()
+
+
+# ======================
+# Job Utama
+# ======================
+def rescore(model, model_path, history_dir, out_dir, fmt="csv", batch_size=BATCH_SIZE,
+            part_size=2048, max_workers=None, limit=None):
+    os.makedirs(out_dir, exist_ok=True)
+    checkpoint = load_checkpoint(out_dir, model_identity(model_path))
+    # Nama file diawali timestamp, jadi urutan naik stabil walau ada deteksi baru selama job berjalan;
+    # checkpoint cukup menyimpan nama file terakhir yang sudah ditulis
+    names = [n for n in sorted(list_files(history_dir)) if n > checkpoint["last_file"]]
+    if limit is not None:
+        names = names[:limit]
+    old = _old_labels(history_dir)
+
+    start = time.perf_counter()
+    start_processed = checkpoint["processed"]
+    rows = []
+    sources = ((name, os.path.join(history_dir, name)) for name in names)
+
+    def flush():
+        if not rows:
+            return
+        write_part(out_dir, checkpoint["next_part"], rows, fmt)
+        checkpoint["next_part"] += 1
+        checkpoint["processed"] += len(rows)
+        checkpoint["last_file"] = rows[-1]["file"]
+        save_checkpoint(out_dir, checkpoint)
+        rows.clear()
+
+    for name, probs, error in predict_many(model, sources, batch_size=batch_size, max_workers=max_workers):
+        if name in old:
+            old_label, created_at = old[name]
+        else:
+            created, old_label = parse_legacy_name(name)
+            created_at = created.isoformat(sep=" ") if created else None
+
+        row = {"file": name, "created_at": created_at, "old_label": old_label, "error": error}
+        if probs is None:
+            checkpoint["failed"] += 1
+            row.update({"new_label": None, "new_confidence": None, "agree": None})
+            row.update({c: None for c in PROB_COLUMNS})
+        else:
+            new_label = idx_to_class[int(np.argmax(probs))]
+            agree = new_label == old_label
+            row.update({"new_label": new_label, "new_confidence": float(np.max(probs)), "agree": agree})
+            row.update({c: float(p) for c, p in zip(PROB_COLUMNS, probs)})
+            checkpoint["total"] += 1
+            checkpoint["agree"] += int(agree)
+            pair = checkpoint["confusion"].setdefault(old_label, {})
+            pair[new_label] = pair.get(new_label, 0) + 1
+        rows.append(row)
+
+        if len(rows) >= part_size:
+            flush()
+            rate = (checkpoint["processed"] - start_processed) / max(time.perf_counter() - start, 1e-9)
+            print(f"{checkpoint['processed']} gambar ({rate:.1f}/dtk sesi ini)", flush=True)
+    flush()
+
+    checkpoint["seconds_last_run"] = time.perf_counter() - start
+    save_checkpoint(out_dir, checkpoint)
+    return checkpoint
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Skor ulang arsip riwayat dengan model baru")
+    parser.add_argument("--model", default="model999.h5")
+    parser.add_argument("--history", default=HISTORY_DIR)
+    parser.add_argument("--out", default="rescore_out")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--part-size", type=int, default=2048, help="Jumlah baris per file part/checkpoint")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Thread decode paralel")
+    parser.add_argument("--threads", type=int, help="Jumlah thread inferensi")
+    parser.add_argument("--limit", type=int, help="Proses paling banyak N gambar pada run ini")
+    args = parser.parse_args()
+
+    from backends import load_backend
+    model = load_backend(args.model, num_threads=args.threads)
+    checkpoint = rescore(model, args.model, args.history, args.out, fmt=args.format,
+                         batch_size=args.batch_size, part_size=args.part_size,
+                         max_workers=args.workers, limit=args.limit)
+
+    summary = {
+        "processed": checkpoint["processed"],
+        "scored": checkpoint["total"],
+        "failed": checkpoint["failed"],
+        "agreement": checkpoint["agree"] / checkpoint["total"] if checkpoint["total"] else None,
+        "confusion_old_to_new": checkpoint["confusion"],
+    }
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
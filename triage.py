@@ -0,0 +1,242 @@
+"""Kaskade dua tahap: model triase kecil menangani ikan yang jelas sehat, sisanya diteruskan ke Xception.
+
+Model triase adalah CNN kecil yang memprediksi peluang "Healthy Fish" dan dilatih (distilasi) dari
+probabilitas Xception yang sudah tersimpan di database riwayat. `TriageCascade` punya `predict()`
+seperti model Keras, jadi bisa dipakai di semua jalur inferensi tanpa perubahan lain.
+
+    python triage.py train --out triage.keras --tflite          # latih dari riwayat_upload/riwayat.db
+    python triage.py evaluate triage.tflite "riwayat_upload/*.jpg" --thresholds 0.8 0.9 0.95
+"""
+import argparse
+import glob
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+import metrics
+from inference import SOURCE_MODEL, SOURCE_TRIAGE, class_labels, predict_many
+from model_registry import INPUT_SIZE
+
+HEALTHY_IDX = class_labels["Healthy Fish"]
+DEFAULT_THRESHOLD = 0.9
+
+
+# ======================
+# Kaskade
+# ======================
+class TriageCascade:
+    """Jalankan `triage_model` dulu; hanya gambar yang tidak jelas sehat diteruskan ke `full_model`.
+
+    Untuk gambar yang berhenti di triase, vektor probabilitas berisi peluang sehat dari model triase
+    dan sisanya dibagi rata ke kelas penyakit; `predict_with_source` menandai baris tersebut
+    agar tidak dianggap keluaran Xception (mis. saat melatih ulang model triase).
+    """
+
+    def __init__(self, triage_model, full_model, healthy_threshold=DEFAULT_THRESHOLD):
+        self.triage_model = triage_model
+        self.full_model = full_model
+        self.healthy_threshold = healthy_threshold
+        self.stats = {"total": 0, "escalated": 0}
+        self._lock = threading.Lock()
+
+    @property
+    def escalation_rate(self):
+        return self.stats["escalated"] / self.stats["total"] if self.stats["total"] else None
+
+    def predict(self, x, batch_size=None, verbose=0):
+        return self.predict_with_source(x, batch_size=batch_size)[0]
+
+    def predict_with_source(self, x, batch_size=None):
+        """Probabilitas per gambar beserta sumbernya (SOURCE_TRIAGE atau SOURCE_MODEL)."""
+        with metrics.timer("triage_predict_seconds"):
+            p_healthy = np.asarray(self.triage_model.predict(x, batch_size=batch_size, verbose=0)).reshape(len(x))
+
+        n_classes = len(class_labels)
+        out = np.empty((len(x), n_classes), dtype=np.float32)
+        out[:] = ((1.0 - p_healthy) / (n_classes - 1))[:, np.newaxis]
+        out[:, HEALTHY_IDX] = p_healthy
+
+        escalate = np.flatnonzero(p_healthy < self.healthy_threshold)
+        if len(escalate):
+            # Semua gambar yang perlu Xception dikirim sebagai satu batch
+            out[escalate] = self.full_model.predict(x[escalate], batch_size=batch_size, verbose=0)
+
+        with self._lock:
+            self.stats["total"] += len(x)
+            self.stats["escalated"] += len(escalate)
+        metrics.inc("triage_total", len(x) - len(escalate), outcome="early_exit")
+        metrics.inc("triage_total", len(escalate), outcome="escalated")
+        sources = [SOURCE_TRIAGE] * len(x)
+        for i in escalate:
+            sources[i] = SOURCE_MODEL
+        return out, sources
+
+
+# ======================
+# Model Triase
+# ======================
+def build_triage_model():
+    """CNN kecil dengan input 299x299 yang sama; langsung di-downsample agar murah."""
+    from tensorflow import keras
+    from tensorflow.keras import layers
+
+    return keras.Sequential([
+        keras.Input(shape=(*INPUT_SIZE, 3)),
+        layers.AveragePooling2D(3),                      # 299 -> 99
+        layers.Conv2D(16, 3, strides=2, activation="relu"),
+        layers.Conv2D(32, 3, strides=2, activation="relu"),
+        layers.SeparableConv2D(64, 3, strides=2, activation="relu"),
+        layers.SeparableConv2D(96, 3, activation="relu"),
+        layers.GlobalAveragePooling2D(),
+        layers.Dropout(0.2),
+        layers.Dense(1, activation="sigmoid"),
+    ])
+
+
+def _history_samples(history_dir):
+    # (path gambar, peluang sehat menurut Xception); hasil yang berhenti di triase tidak dipakai,
+    # agar model triase tidak didistilasi dari keluarannya sendiri
+    from history import connect
+    conn = connect(history_dir)
+    try:
+        rows = conn.execute(
+            "SELECT image_path, probabilities FROM detections WHERE probabilities IS NOT NULL AND source = ?",
+            (SOURCE_MODEL,),
+        ).fetchall()
+    finally:
+        conn.close()
+    return [(path, float(np.frombuffer(blob, dtype=np.float32)[HEALTHY_IDX]))
+            for path, blob in rows if os.path.exists(path)]
+
+
+def _load_tensor(path):
+    from ingest import decode_tensor
+    return decode_tensor(path)
+
+
+def train(history_dir, out_path, epochs=10, batch_size=32, validation_split=0.1, seed=0):
+    """Distilasi: latih model triase terhadap peluang sehat dari Xception (soft label)."""
+    import tensorflow as tf
+
+    samples = _history_samples(history_dir)
+    if len(samples) < 20:
+        raise SystemExit(f"Riwayat berprobabilitas terlalu sedikit untuk dilatih ({len(samples)} gambar)")
+    rng = np.random.default_rng(seed)
+    rng.shuffle(samples)
+    n_val = max(1, int(len(samples) * validation_split))
+
+    def dataset(items, shuffle):
+        # Gambar dibaca per batch dari disk, tidak seluruh riwayat dimuat ke memori
+        def gen():
+            order = rng.permutation(len(items)) if shuffle else range(len(items))
+            for i in order:
+                path, target = items[i]
+                yield _load_tensor(path), np.float32(target)
+        return tf.data.Dataset.from_generator(
+            gen,
+            output_signature=(tf.TensorSpec((*INPUT_SIZE, 3), tf.float32), tf.TensorSpec((), tf.float32)),
+        ).batch(batch_size).prefetch(2)
+
+    model = build_triage_model()
+    model.compile(optimizer="adam", loss="binary_crossentropy", metrics=["binary_accuracy"])
+    model.fit(dataset(samples[n_val:], True), validation_data=dataset(samples[:n_val], False), epochs=epochs)
+    model.save(out_path)
+    return out_path
+
+
+class _PairedModels:
+    """Jalankan Xception & model triase pada batch yang sama, dengan waktu masing-masing dicatat."""
+
+    def __init__(self, triage_model, full_model):
+        self.triage_model = triage_model
+        self.full_model = full_model
+        self.seconds = {"triage": 0.0, "full": 0.0}
+
+    def predict(self, x, batch_size=None, verbose=0):
+        start = time.perf_counter()
+        full = np.asarray(self.full_model.predict(x, batch_size=batch_size, verbose=0))
+        self.seconds["full"] += time.perf_counter() - start
+        start = time.perf_counter()
+        p_healthy = np.asarray(self.triage_model.predict(x, batch_size=batch_size, verbose=0)).reshape(len(x), 1)
+        self.seconds["triage"] += time.perf_counter() - start
+        return np.hstack([full, p_healthy])
+
+
+def evaluate(triage_model, full_model, paths, thresholds, batch_size=32):
+    """Laporan per ambang: tingkat eskalasi, kesesuaian label dengan Xception, dan estimasi biaya.
+
+    Gambar dibaca per batch lewat `predict_many`, jadi memori tidak bergantung pada jumlah sampel.
+    """
+    paired = _PairedModels(triage_model, full_model)
+    full_labels, p_healthy, failed = [], [], 0
+    for _, out, _ in predict_many(paired, ((p, p) for p in paths), batch_size=batch_size):
+        if out is None:
+            failed += 1
+            continue
+        full_labels.append(int(np.argmax(out[:-1])))
+        p_healthy.append(float(out[-1]))
+    if not full_labels:
+        raise SystemExit("Tidak ada gambar sampel yang bisa dibaca")
+    full_labels, p_healthy = np.array(full_labels), np.array(p_healthy)
+    n = len(full_labels)
+
+    report = {
+        "samples": n,
+        "failed": failed,
+        "xception_ms_per_image": paired.seconds["full"] / n * 1000,
+        "triage_ms_per_image": paired.seconds["triage"] / n * 1000,
+        "thresholds": [],
+    }
+    for threshold in thresholds:
+        early = p_healthy >= threshold
+        cascade_labels = np.where(early, HEALTHY_IDX, full_labels)
+        escalation_rate = float(1 - early.mean())
+        report["thresholds"].append({
+            "threshold": threshold,
+            "escalation_rate": escalation_rate,
+            # Xception dianggap acuan: delta akurasi = proporsi label yang berubah karena kaskade
+            "agreement_with_xception": float((cascade_labels == full_labels).mean()),
+            "accuracy_delta_vs_xception": float((cascade_labels == full_labels).mean() - 1),
+            "missed_disease_rate": float((early & (full_labels != HEALTHY_IDX)).mean()),
+            "est_ms_per_image": report["triage_ms_per_image"] + escalation_rate * report["xception_ms_per_image"],
+        })
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Model triase & kaskade deteksi")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_train = sub.add_parser("train", help="Latih model triase dari database riwayat")
+    p_train.add_argument("--history", default="riwayat_upload")
+    p_train.add_argument("--out", default="triage.keras")
+    p_train.add_argument("--epochs", type=int, default=10)
+    p_train.add_argument("--tflite", action="store_true", help="Ekspor juga ke .tflite (float16)")
+
+    p_eval = sub.add_parser("evaluate", help="Laporan eskalasi & selisih akurasi vs Xception")
+    p_eval.add_argument("triage_model")
+    p_eval.add_argument("samples", nargs="+")
+    p_eval.add_argument("--model", default="model999.h5")
+    p_eval.add_argument("--thresholds", type=float, nargs="+", default=[0.8, 0.9, 0.95])
+
+    args = parser.parse_args()
+    if args.command == "train":
+        out = train(args.history, args.out, epochs=args.epochs)
+        if args.tflite:
+            from backends import export_tflite
+            out = export_tflite(out, f"{os.path.splitext(out)[0]}.tflite", quantize="float16")
+        print(f"Model triase disimpan: {out}")
+    else:
+        from backends import load_backend
+        paths = sorted({p for pattern in args.samples for p in glob.glob(pattern)})
+        if not paths:
+            parser.error("Tidak ada gambar sampel yang ditemukan")
+        report = evaluate(load_backend(args.triage_model), load_backend(args.model), paths, args.thresholds)
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()